@@ -9,7 +9,7 @@ from bs4 import BeautifulSoup  # Import BeautifulSoup for parsing HTML content.
 from rich import print  # Import rich for styled console output.
 from groq import Groq  # Import Groq for AI chat functionalities.
 import subprocess  # Import subprocess for interacting with the system.
-import requests  # Import requests for making HTTP requests.
+from Backend.HttpClient import HttpGet  # Import the shared pooled HTTP client.
 import keyboard  # Import keyboard for keyboard-related actions.
 import os  # Import os for operating system functionalities.
 
@@ -106,7 +106,7 @@ def PlayYoutube(query):
     return True  # Indicate success.
 # PlayYoutube("Python Course")  # Play a sample video on YouTube.
 # Function to open an application or a relevant webpage.
-def OpenApp(app, sess=requests.session()):
+def OpenApp(app, sess=None):
 
     try:
         appopen(app, match_closest=True, output=True, throw_error=True)  # Attempt to open the app.
@@ -125,7 +125,7 @@ def OpenApp(app, sess=requests.session()):
         def search_google(query):
             url = f"https://www.google.com/search?q={query}"  # Construct the Google search URL.
             headers = {"User-Agent": useragent}  # Use the predefined user-agent.
-            response = sess.get(url, headers=headers)  # Perform the GET request.
+            response = sess.get(url, headers=headers) if sess else HttpGet(url, headers=headers)  # Perform the GET request on the shared session unless one was given.
 
             if response.status_code == 200:
                 return response.text  # Return the HTML content.
@@ -0,0 +1,162 @@
+import atexit  # Import atexit to flush pending cache writes on shutdown.
+import json  # Import json for on-disk persistence.
+import os  # Import os for file handling.
+import threading  # Import threading so the cache can be shared across worker threads.
+import time  # Import time for entry expiry.
+from collections import OrderedDict  # Import OrderedDict to keep LRU order.
+
+class LRUCache:
+    """ Size-bounded LRU cache with a per-entry TTL and optional JSON persistence.
+    Writes are coalesced: a Set schedules one save `save_delay` seconds later on a timer thread. """
+
+    def __init__(self, max_size: int = 256, ttl: float = 3600, path: str = None, save_delay: float = 1.0):
+        self.max_size = max_size  # Maximum number of entries before the least recently used one is evicted.
+        self.ttl = ttl  # Default lifetime of an entry in seconds (None means no expiry).
+        self.path = path  # JSON file used to persist entries across restarts (None keeps the cache in memory).
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer of the JSON file at a time.
+        self._save_timer = None  # Pending coalesced save, if any.
+        self.Load()
+        if self.path:
+            atexit.register(self.Save)  # Flush a save that is still waiting on its timer.
+
+    def Get(self, key, default=None, record: bool = True):
+        # Return a live entry and mark it as most recently used; record=False skips the hit/miss counters.
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.time()):
+                self._data.move_to_end(key)
+                self.hits += record
+                return entry[1]
+            if entry is not None:
+                del self._data[key]  # Drop the expired entry.
+            self.misses += record
+            return default
+
+    def Set(self, key, value, ttl: float = None):
+        # Insert or refresh an entry and evict the least recently used ones past max_size.
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.time() + ttl if ttl else None, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+        self._ScheduleSave()
+
+    def Clear(self):
+        with self._lock:
+            self._data.clear()
+        self.Save()
+
+    def Stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+    def Load(self):
+        # Restore persisted entries, skipping the ones that expired while we were not running.
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading cache {self.path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for key, expires_at, value in entries[-self.max_size:]:
+                if expires_at is None or expires_at > now:
+                    self._data[key] = (expires_at, value)
+
+    def _ScheduleSave(self):
+        # Coalesce the saves of a burst of Sets into one write, off the caller's thread.
+        if not self.path:
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self._TimedSave)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _TimedSave(self):
+        with self._lock:
+            self._save_timer = None  # Sets from now on schedule the next save.
+        self.Save()
+
+    def Save(self):
+        # Write the entries in LRU order via a per-writer temp file so a crash never leaves a half-written cache.
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                entries = [[key, expires_at, value] for key, (expires_at, value) in self._data.items()]
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f)
+                os.replace(temp_path, self.path)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Error saving cache {self.path}: {e}")
+
+class StaleWhileRevalidateCache:
+    """ Response cache for a slow or rate-limited provider. Entries are fresh for `ttl` seconds; for `stale`
+    seconds after that they are still served immediately while a background thread fetches a new value. """
+
+    def __init__(self, ttl: float, stale: float = None, max_size: int = 128):
+        self.ttl = ttl
+        self.stale = ttl if stale is None else stale
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = LRUCache(max_size=max_size, ttl=ttl + self.stale)  # key -> [fetched_at, value]
+        self._refreshing = set()  # Keys with a background refresh in flight.
+        self._lock = threading.Lock()
+
+    def Fetch(self, key, loader):
+        # Return the cached value for key, calling loader() on a miss. Exceptions from loader are not cached.
+        entry = self._entries.Get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            elif time.time() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            else:
+                self.stale_hits += 1
+        if entry is None:
+            return self._Load(key, loader)
+        self._Revalidate(key, loader)
+        return entry[1]
+
+    def _Load(self, key, loader):
+        value = loader()
+        self._entries.Set(key, [time.time(), value])
+        return value
+
+    def _Revalidate(self, key, loader):
+        # Refresh a stale entry in the background, at most one refresh per key at a time.
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def Refresh():
+            try:
+                self._Load(key, loader)
+            except Exception as e:
+                print(f"Error refreshing cached entry {key}: {e}")  # Keep serving the stale value.
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=Refresh, daemon=True).start()
+
+    def Stats(self) -> dict:
+        with self._lock:
+            return {"size": self._entries.Stats()["size"], "hits": self.hits, "stale": self.stale_hits, "misses": self.misses}
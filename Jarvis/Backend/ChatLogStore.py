@@ -0,0 +1,80 @@
+import json  # Import json to encode one message per line.
+import os  # Import os for file handling.
+import threading  # Import threading since the GUI and worker threads share the store.
+
+# Append-only chat history (one JSON message per line) and the legacy file it replaces.
+ChatLogPath = os.path.join("Data", "ChatLog.jsonl")
+LegacyChatLogPath = os.path.join("Data", "ChatLog.json")
+
+class ChatLogStore:
+    """ Chat history with O(1) appends to a JSONL file and an in-memory copy shared by all modules. """
+
+    def __init__(self, path: str = ChatLogPath, legacy_path: str = LegacyChatLogPath):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._messages = []
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _Load(self):
+        # Read the log once; every later call is served from memory.
+        if self._loaded:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not os.path.exists(self.path):
+            self._Migrate()
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._messages.append(json.loads(line))
+                    except ValueError:
+                        pass  # Skip a line torn by a crash mid-write.
+        self._loaded = True
+
+    def _Migrate(self):
+        # One-time conversion of the old Data/ChatLog.json list into the JSONL log.
+        if not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, "r", encoding="utf-8") as f:
+                legacy_messages = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error migrating {self.legacy_path}: {e}")
+            return
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for message in legacy_messages:
+                f.write(json.dumps(message, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        print(f"Migrated {len(legacy_messages)} messages from {self.legacy_path} to {self.path}")
+
+    def Messages(self) -> list:
+        # A shallow copy so callers can add their own messages without touching the log.
+        with self._lock:
+            self._Load()
+            return list(self._messages)
+
+    def Range(self, start: int, end: int = None) -> list:
+        # Messages [start:end] without copying the whole history.
+        with self._lock:
+            self._Load()
+            return self._messages[start:end]
+
+    def Count(self) -> int:
+        with self._lock:
+            self._Load()
+            return len(self._messages)
+
+    def Append(self, *messages):
+        # Write only the new messages; the existing history is never rewritten.
+        with self._lock:
+            self._Load()
+            with open(self.path, "a", encoding="utf-8") as f:
+                for message in messages:
+                    f.write(json.dumps(message, ensure_ascii=False) + "\n")
+            self._messages.extend(messages)
+
+# The store shared by Chatbot, RealtimeSearchEngine and Main.
+ChatLog = ChatLogStore()
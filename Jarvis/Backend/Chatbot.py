@@ -1,7 +1,8 @@
 from groq import Groq
-from json import load, dump
 import datetime
 from dotenv import dotenv_values
+from Backend.ChatLogStore import ChatLog
+from Backend.ContextWindow import ContextWindow
 
 env_vars = dotenv_values(".env")
 
@@ -23,15 +24,27 @@ SystemChatBot = [
     {"role": "system", "content": System}
 ]
 
-# Attempt to load the chat log from a JSON file.
-try:
-    with open(r"Data\\ChatLog.json", "r") as f:
-        messages = load(f)  # Load existing messages from the chat log.
-
-except FileNotFoundError:
-    # If the file doesn't exist, create an empty JSON file to store chat logs.
-    with open(r"Data\\ChatLog.json", "w") as f:
-        dump([], f)
+# Function to fold old chat turns into the rolling summary used by the context window.
+def SummarizeHistory(Summary, Messages):
+    Transcript = "\n".join(f"{m['role']}: {m['content']}" for m in Messages)
+    completion = client.chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[
+            {"role": "system", "content": "Summarize this conversation between a user and an AI assistant in under 150 words. Keep names, facts and open requests, drop small talk."},
+            {"role": "user", "content": f"Summary so far:\n{Summary or 'None'}\n\nNew messages:\n{Transcript}"}
+        ],
+        max_tokens=256,
+        temperature=0.3,
+        stream=False
+    )
+    return completion.choices[0].message.content.strip()
+
+# Keep each request under a token budget: recent turns verbatim, older ones summarized.
+Context = ContextWindow(
+    token_budget=int(env_vars.get("ChatTokenBudget") or 6000),
+    recent_turns=int(env_vars.get("ChatRecentTurns") or 6),
+    summarize=SummarizeHistory
+)
 
 # Function to get real-time date and time information.
 def RealtimeInformation():
@@ -59,24 +72,22 @@ def AnswerModifier(Answer):
     return modified_answer
 
 # Main chatbot function to handle user queries.
-def ChatBot(Query):
-    """ This function sends the user's query to the chatbot and returns the AI's response. """
+def ChatBot(Query, OnChunk=None):
+    """ This function sends the user's query to the chatbot and returns the AI's response.
+    If OnChunk is given it is called with each piece of text as soon as it arrives from the stream. """
 
     try:
-        # Load the existing chat log from the JSON file with UTF-8 encoding.
-        try:
-            with open(r"Data\\ChatLog.json", "r", encoding='utf-8') as f:
-                messages = load(f)
-        except (FileNotFoundError, ValueError):
-            messages = []
+        # Get the chat history from the shared in-memory chat log.
+        messages = ChatLog.Messages()
 
         # Append the user's query to the messages list (fixed: only append once).
-        messages.append({"role": "user", "content": f"{Query}"})
+        UserMessage = {"role": "user", "content": f"{Query}"}
+        messages.append(UserMessage)
 
         # Make a request to the Groq API 
         completion = client.chat.completions.create(
             model="llama-3.1-8b-instant",  # Specify the AI model to use.
-            messages=SystemChatBot + [{"role": "system", "content": RealtimeInformation()}] + messages,  # Include system messages and real-time information.
+            messages=Context.Build(SystemChatBot + [{"role": "system", "content": RealtimeInformation()}], messages),  # Include system messages, real-time information and the trimmed history.
             max_tokens=1024,  # Limit the maximum tokens in the response.
             temperature=0.7,  # Adjust response randomness (higher means more random).
             top_p=1,
@@ -85,19 +96,20 @@ def ChatBot(Query):
             stop=None  # Allow the model to determine when to stop.
         )
 
+        print(f"ChatBot request: ~{Context.last_tokens} prompt tokens")
+
         Answer = ""
         for chunk in completion:  # completion is already an iterable stream
             if chunk.choices[0].delta.content:
                 Answer += chunk.choices[0].delta.content
+                if OnChunk:
+                    OnChunk(chunk.choices[0].delta.content.replace("</s>", ""))  # Push the partial text to the caller.
 
         Answer = Answer.replace("</s>", "")  # Clean up any unwanted tokens from the response.
 
-        # Append the chatbot's response to the messages list.
-        messages.append({"role": "assistant", "content": Answer})
-
-        # Save the updated chat log to the JSON file with UTF-8 encoding.
-        with open(r"Data\\ChatLog.json", "w", encoding='utf-8') as f:
-            dump(messages, f, indent=4)
+        # Append only this turn to the chat log instead of rewriting the whole file.
+        ChatLog.Append(UserMessage, {"role": "assistant", "content": Answer})
+        Context.Refresh(messages + [{"role": "assistant", "content": Answer}])  # Summarize in the background, off the request path.
         
         return AnswerModifier(Answer=Answer)
 
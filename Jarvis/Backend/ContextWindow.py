@@ -0,0 +1,103 @@
+import threading  # Import threading since requests can come from several worker threads.
+import time  # Import time for the summarizer back-off.
+
+# Rough token estimate: about four characters per token plus a few tokens of per-message overhead.
+CharsPerToken = 4
+MessageOverhead = 4
+
+# After a failed summary the summarizer is left alone for this many seconds, doubled per further failure.
+RetryBackoff = 30
+MaxRetryBackoff = 600
+
+# On a cold start only the newest SummaryHorizon messages of a long log are summarized; anything older is
+# deliberately left out of the context rather than costing hundreds of summarizer calls.
+SummaryHorizon = 200
+
+def CountTokens(messages: list) -> int:
+    # Approximate the number of prompt tokens in a list of chat messages.
+    return sum(len(str(message.get("content", ""))) // CharsPerToken + MessageOverhead for message in messages)
+
+class ContextWindow:
+    """ Keeps chat requests under a token budget: recent turns verbatim, older turns as a rolling summary.
+    The summary is refreshed in the background after an answer, so no request waits for the summarizer. """
+
+    def __init__(self, token_budget: int = 6000, recent_turns: int = 6, summarize=None):
+        self.token_budget = token_budget  # Maximum prompt tokens per request.
+        self.recent_turns = recent_turns  # Number of user/assistant turns sent verbatim.
+        self.summarize = summarize  # summarize(previous_summary, messages) -> new summary text.
+        self.summary = ""  # Cached summary of history[:summarized_count].
+        self.summarized_count = 0
+        self.last_tokens = 0  # Estimated prompt tokens of the last request built.
+        self.failures = 0  # Consecutive summarizer failures.
+        self.retry_at = 0.0  # No summarizer call before this time after a failure.
+        self.refreshing = False
+        self._lock = threading.Lock()
+
+    def _Refresh(self, history: list):
+        # Fold the messages pushed out of the recent turns into the summary, oldest first, in batches of
+        # 2 * recent_turns turns, until every message outside the recent turns is summarized.
+        older = history[:len(history) - 2 * self.recent_turns]
+        batch = 4 * self.recent_turns or len(older)
+        while True:
+            with self._lock:
+                if len(older) < self.summarized_count:
+                    self.summary, self.summarized_count = "", 0  # The history was reset.
+                if len(older) - self.summarized_count < 2 * self.recent_turns or time.monotonic() < self.retry_at:
+                    return
+                if self.summarized_count == 0 and not self.summary:
+                    self.summarized_count = max(0, len(older) - SummaryHorizon)  # Cold start on a long log.
+                summary, start = self.summary, self.summarized_count
+            end = min(len(older), start + batch)
+
+            try:
+                summary = self.summarize(summary, older[start:end])
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                    backoff = min(MaxRetryBackoff, RetryBackoff * 2 ** (self.failures - 1))
+                    self.retry_at = time.monotonic() + backoff
+                print(f"Error summarizing chat history (next try in {backoff}s): {e}")
+                return
+
+            with self._lock:
+                if self.summarized_count != start:
+                    return  # The history was reset meanwhile.
+                self.summary, self.summarized_count = summary, end
+                self.failures, self.retry_at = 0, 0.0
+
+    def Refresh(self, history: list):
+        """ Update the summary on a background thread; call it after an answer with the full history. """
+        with self._lock:
+            if self.refreshing or self.summarize is None:
+                return
+            self.refreshing = True
+
+        def Run():
+            try:
+                self._Refresh(history)
+            finally:
+                with self._lock:
+                    self.refreshing = False
+
+        threading.Thread(target=Run, daemon=True).start()
+
+    def Build(self, system_messages: list, history: list) -> list:
+        """ Return the messages to send; history ends with the current user message.
+        Everything after the summary is sent verbatim, newest first, as far as the token budget allows. The summary
+        never covers the last recent_turns turns (see _Refresh), so those are always sent unless the budget is hit. """
+        with self._lock:
+            start = self.summarized_count if self.summarized_count <= len(history) else 0  # 0 if the history was reset.
+            summary = [{"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}] if start and self.summary else []
+
+        # Keep the newest messages that fit, counting each one once while walking back from the current query.
+        used = CountTokens(system_messages + summary)
+        first = len(history)
+        while first > start:
+            tokens = CountTokens(history[first - 1:first])
+            if first < len(history) and used + tokens > self.token_budget:
+                break  # The current query is always sent.
+            used += tokens
+            first -= 1
+
+        self.last_tokens = used
+        return system_messages + summary + history[first:]
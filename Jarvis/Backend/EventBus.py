@@ -0,0 +1,38 @@
+import threading  # Import threading since events are published from worker threads and read by the GUI.
+
+class EventBus:
+    """ In-process publish/subscribe between the assistant threads and the GUI.
+    Each topic keeps its latest value, so a subscriber that comes up late (the GUI) can catch up with Latest(). """
+
+    def __init__(self):
+        self._subscribers = {}  # topic -> list of callbacks
+        self._latest = {}  # topic -> last published value
+        self._lock = threading.Lock()
+
+    def Subscribe(self, topic, callback):
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+        return callback
+
+    def Unsubscribe(self, topic, callback):
+        with self._lock:
+            if callback in self._subscribers.get(topic, []):
+                self._subscribers[topic].remove(callback)
+
+    def Publish(self, topic, value):
+        # Callbacks run on the publishing thread; the GUI bridges them to Qt signals.
+        with self._lock:
+            self._latest[topic] = value
+            callbacks = list(self._subscribers.get(topic, []))
+        for callback in callbacks:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"Error in EventBus subscriber for {topic}: {e}")
+
+    def Latest(self, topic, default=None):
+        with self._lock:
+            return self._latest.get(topic, default)
+
+# Shared bus. Topics: "status" (assistant status text), "mic" ("True"/"False"), "response" ((sequence, text, partial)), see ShowTextToScreen.
+Bus = EventBus()
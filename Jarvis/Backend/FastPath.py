@@ -0,0 +1,179 @@
+import argparse  # Import argparse for the corpus check command line.
+import json  # Import json to read the labeled corpus.
+import os  # Import os for the corpus path.
+import re  # Import re for the precompiled command patterns.
+import threading  # Import threading to guard the hit/miss counters.
+
+# Words that can never be a real application name on their own, so "open it" etc. still go to Cohere.
+AmbiguousTargets = {"it", "that", "this", "them", "those", "these", "file", "the file", "something", "anything"}
+
+# Words that signal a conversational request rather than an application name.
+ConversationalWords = {
+    "tell", "me", "about", "what", "who", "why", "how", "when", "where", "is", "are", "write",
+    "search", "remind", "reminder", "set", "explain", "my", "your", "you", "i", "please", "and",
+}
+
+# Spoken variants of the system commands understood by Automation.System.
+SystemAliases = {
+    "mute": "mute",
+    "mute the volume": "mute",
+    "mute volume": "mute",
+    "unmute": "unmute",
+    "unmute the volume": "unmute",
+    "unmute volume": "unmute",
+    "volume up": "volume up",
+    "increase volume": "volume up",
+    "increase the volume": "volume up",
+    "turn up the volume": "volume up",
+    "turn the volume up": "volume up",
+    "volume down": "volume down",
+    "decrease volume": "volume down",
+    "decrease the volume": "volume down",
+    "turn down the volume": "volume down",
+    "turn the volume down": "volume down",
+}
+
+# Phrases that unambiguously end the conversation.
+ExitPhrases = {"bye", "goodbye", "good bye", "bye bye", "exit", "quit", "see you", "see you later"}
+
+# Precompiled single-command patterns, tried in order. Each maps a segment to a DMM task string.
+SegmentPatterns = [
+    (re.compile(r"^(open|close) (?:the )?(?:app |application |website )?([a-z0-9][a-z0-9 .\-]{0,40})$"), lambda m: f"{m.group(1)} {m.group(2)}"),
+    (re.compile(r"^play (?:the )?(?:song )?(.{1,80})$"), lambda m: f"play {m.group(1)}"),
+    (re.compile(r"^(google|youtube) search (?:for )?(.{1,80})$"), lambda m: f"{m.group(1)} search {m.group(2)}"),
+    (re.compile(r"^search (?:for )?(.{1,80}) on (google|youtube)$"), lambda m: f"{m.group(2)} search {m.group(1)}"),
+    (re.compile(r"^generate (?:an? )?(image|video) (?:of )?(.{1,200})$"), lambda m: f"generate {m.group(1)} {m.group(2)}"),
+]
+
+# Time and date questions are always 'general' according to the DMM preamble.
+TimeQuestionPattern = re.compile(r"^(?:what(?:'s| is) )?(?:the )?(?:current )?(time|date|day|month|year)(?: (?:is it|today|now|right now))?$|^what (time|day) is it(?: today| now)?$")
+
+# Separators between multiple commands in one utterance.
+SplitPattern = re.compile(r"\s*(?:,|\band then\b|\bthen\b|\band\b)\s*")
+
+# First words of the commands the DMM knows, used to spot a second command after a song title or image prompt.
+CommandVerbs = {
+    "open", "close", "play", "generate", "google", "youtube", "search", "system", "content", "reminder",
+    "mute", "unmute", "volume", "increase", "decrease", "turn", "exit", "bye",
+}
+
+# A comma, "then", or "and" followed by a command verb or conversational word: "play believer, open chrome",
+# "play let her go and tell me the weather". Titles like "rock and roll" do not match.
+CompoundCommandPattern = re.compile(r",|\bthen\b|\band (?:" + "|".join(sorted(CommandVerbs | ConversationalWords)) + r")\b")
+
+# Trailing punctuation added by QueryModifier and filler words users put in front of commands.
+TrailingPunctuation = re.compile(r"[.?!\s]+$")
+LeadingFiller = re.compile(r"^(?:(?:hey |ok |okay )?(?:jarvis|assistant)[, ]+)?(?:please |can you |could you |would you )*")
+
+# Hit/miss counters so we can see how much traffic the fast path absorbs.
+FastPathStats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+def NormalizeCommand(prompt: str) -> str:
+    # Lower-case, drop the punctuation QueryModifier appends and collapse whitespace.
+    text = TrailingPunctuation.sub("", prompt.lower().strip())
+    text = re.sub(r"\s+", " ", text)
+    return LeadingFiller.sub("", text).strip()
+
+def IsAppName(target: str) -> bool:
+    # Short, free of pronouns and conversational words, e.g. "chrome" or "visual studio code".
+    words = target.split()
+    if not words or len(words) > 3 or target in AmbiguousTargets:
+        return False
+    return not any(word in ConversationalWords for word in words) and re.fullmatch(r"[a-z0-9][a-z0-9 .\-]*", target) is not None
+
+def MatchSegment(segment: str, previous_verb=None):
+    # System commands come first since "volume up" would otherwise look like nothing.
+    if segment in SystemAliases:
+        return f"system {SystemAliases[segment]}"
+
+    for pattern, build in SegmentPatterns:
+        match = pattern.match(segment)
+        if match:
+            task = build(match)
+            if task.startswith(("open ", "close ")) and not IsAppName(task.split(" ", 1)[1]):
+                return None  # "open it" or "open and tell me..." needs Cohere.
+            return task
+
+    # "open chrome and firefox": a bare name inherits the previous open/close verb.
+    if previous_verb in ("open", "close") and IsAppName(segment):
+        return f"{previous_verb} {segment}"
+
+    return None
+
+def FastPathDecision(prompt: str, record: bool = True):
+    """ Classify unambiguous commands locally. Returns a list of tasks, or None if Cohere is needed.
+    record=False leaves the hit/miss counters alone (speculative lookups). """
+    text = NormalizeCommand(prompt)
+    result = None
+
+    if text in ExitPhrases or re.fullmatch(r"(?:bye|goodbye|good bye) (?:jarvis|assistant)", text):
+        result = ["exit"]
+
+    elif TimeQuestionPattern.match(text):
+        result = [f"general {text}"]
+
+    elif text:
+        # Play and generate commands are matched whole because titles and prompts often contain "and",
+        # unless a second command may follow the title, which only Cohere can split reliably.
+        if text.startswith(("play ", "generate ")):
+            segments = [] if CompoundCommandPattern.search(text) else [text]
+        else:
+            segments = [s for s in SplitPattern.split(text) if s]
+        tasks = []
+        previous_verb = None
+        for segment in segments:
+            task = MatchSegment(segment, previous_verb)
+            if task is None:
+                tasks = None  # One unresolved segment sends the whole query to Cohere.
+                break
+            tasks.append(task)
+            previous_verb = task.split(" ", 1)[0]
+        result = tasks or None
+
+    # Record the outcome.
+    if record:
+        with _stats_lock:
+            FastPathStats["hits" if result else "misses"] += 1
+
+    return result
+
+def FastPathReport() -> dict:
+    # Snapshot of the counters plus the fraction of traffic absorbed locally.
+    with _stats_lock:
+        hits, misses = FastPathStats["hits"], FastPathStats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": (hits / total) if total else 0.0}
+
+# Labeled regression corpus: one {"text", "tasks"} object per line, tasks null where Cohere must decide.
+CorpusPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Files", "FastPathCorpus.jsonl")
+
+def LoadCorpus(path: str = CorpusPath) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def RunCorpus(corpus: list) -> list:
+    # The (text, got, expected) rows where the fast path disagrees with the label.
+    errors = []
+    for item in corpus:
+        result = FastPathDecision(item["text"])
+        if result != item["tasks"]:
+            errors.append((item["text"], result, item["tasks"]))
+    return errors
+
+# Entry point for the script: check the labeled corpus, or classify typed commands with --interactive.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the DMM fast path against a labeled corpus.")
+    parser.add_argument("corpus", nargs="?", default=CorpusPath, help="JSONL corpus of {text, tasks}")
+    parser.add_argument("--interactive", action="store_true", help="classify commands typed at the prompt instead")
+    args = parser.parse_args()
+
+    if args.interactive:
+        while True:
+            print(FastPathDecision(input(">>>")), FastPathReport())
+
+    corpus = LoadCorpus(args.corpus)
+    errors = RunCorpus(corpus)
+    print(f"{len(corpus) - len(errors)}/{len(corpus)} labeled commands match, {FastPathReport()['hit_rate']:.1%} handled locally")
+    for text, got, expected in errors:
+        print(f"  {text!r}: {got!r}, expected {expected!r}")
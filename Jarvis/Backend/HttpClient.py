@@ -0,0 +1,53 @@
+import time  # Import time to measure each request.
+from urllib.parse import urlsplit  # Import urlsplit to label metrics by host.
+import requests  # Import requests for the pooled session.
+from requests.adapters import HTTPAdapter  # Import HTTPAdapter to size the connection pools.
+from urllib3.util.retry import Retry  # Import Retry for backoff on 429/5xx.
+from dotenv import dotenv_values  # Import dotenv to read the retry settings.
+from Backend.Timing import RecordStage  # Import RecordStage for per-host request timings.
+
+env_vars = dotenv_values(".env")
+
+# Retry settings: up to HttpRetries extra attempts on a 429 or 5xx response and at most one on a failed connect,
+# sleeping HttpBackoff * 2^(attempt - 1) seconds in between. Read timeouts are never retried: a provider that hangs
+# costs one timeout, not several, and counts as one failure for its circuit breaker.
+HttpRetries = int(env_vars.get("HttpRetries") or 2)
+HttpBackoff = float(env_vars.get("HttpBackoff") or 0.5)
+DefaultTimeout = float(env_vars.get("HttpTimeout") or 10)
+
+def CreateSession() -> requests.Session:
+    """ A session with keep-alive connection pools per host and bounded retries. """
+    retry = Retry(
+        total=HttpRetries,
+        connect=min(1, HttpRetries),
+        read=0,  # The request may have reached the server; a slow provider is not retried into a long stall.
+        other=0,
+        backoff_factor=HttpBackoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),  # Our POSTs (image generation) are safe to repeat.
+        respect_retry_after_header=False,  # A spoken answer cannot wait out a long Retry-After.
+        raise_on_status=False  # Hand the last response back so callers still see the status code.
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# The session shared by every backend, so repeated calls reuse warm TCP+TLS connections.
+Session = CreateSession()
+
+def HttpRequest(method: str, url: str, **kwargs) -> requests.Response:
+    # Timed as the "http <host>" stage in Backend/Timing, retries included.
+    kwargs.setdefault("timeout", DefaultTimeout)
+    start = time.perf_counter()
+    try:
+        return Session.request(method, url, **kwargs)
+    finally:
+        RecordStage(f"http {urlsplit(url).hostname}", time.perf_counter() - start)
+
+def HttpGet(url: str, **kwargs) -> requests.Response:
+    return HttpRequest("GET", url, **kwargs)
+
+def HttpPost(url: str, **kwargs) -> requests.Response:
+    return HttpRequest("POST", url, **kwargs)
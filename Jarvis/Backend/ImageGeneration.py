@@ -1,11 +1,11 @@
 import os
-import requests
 import io
 import time
 import sys
 from pathlib import Path
 from PIL import Image
 from dotenv import load_dotenv
+from Backend.HttpClient import HttpPost
 
 load_dotenv()
 
@@ -64,7 +64,7 @@ def generate_and_save(prompt: str):
 
     try:
         headers = {"Authorization": f"Bearer {HF_TOKEN}"}
-        response = requests.post(API_URL, headers=headers, json={"inputs": prompt}, timeout=60)
+        response = HttpPost(API_URL, headers=headers, json={"inputs": prompt}, timeout=60)
         
         if response.status_code == 200:
             image = Image.open(io.BytesIO(response.content))
@@ -0,0 +1,105 @@
+import json  # Import json to read transcript manifests.
+import os  # Import os for file handling.
+import time  # Import time to pace replayed queries.
+import wave  # Import wave to read the duration of recorded utterances.
+
+class InputSource:
+    """ Where MainExecution gets its queries from. Next() returns the next query, or None when the source is exhausted. """
+
+    def Start(self):
+        # Prepare the source in the background (e.g. launch the browser); called once at startup.
+        pass
+
+    def Next(self, OnPartial=None):
+        raise NotImplementedError
+
+class MicrophoneInput(InputSource):
+    """ The real microphone through Chrome's speech recognition. """
+
+    def Start(self):
+        from Backend.SpeechToText import StartSpeechEngine  # Imported lazily so headless runs never need Selenium.
+        StartSpeechEngine()
+
+    def Next(self, OnPartial=None):
+        from Backend.SpeechToText import SpeechRecognition
+        return SpeechRecognition(OnPartial=OnPartial)
+
+class ReplayInput(InputSource):
+    """ Replays a fixed list of queries, at most `rate` per second (None means as fast as they are consumed). """
+
+    def __init__(self, queries, rate=None):
+        self.queries = list(queries)
+        self.rate = rate
+        self.index = 0
+        self.started_at = None
+
+    def Delay(self, index):
+        # Extra wait before a query, on top of the pacing (used to simulate speaking time).
+        return 0.0
+
+    def Next(self, OnPartial=None):
+        if self.index >= len(self.queries):
+            return None
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+
+        # Issue query i no earlier than i / rate seconds after the first one.
+        if self.rate:
+            wait = self.started_at + self.index / self.rate - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        delay = self.Delay(self.index)
+        if delay > 0:
+            time.sleep(delay)
+
+        query = self.queries[self.index]
+        self.index += 1
+        return query
+
+class ScriptInput(ReplayInput):
+    """ Queries from a text script, one per line; blank lines and lines starting with '#' are skipped. """
+
+    def __init__(self, path, rate=None):
+        with open(path, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+        super().__init__(queries, rate)
+
+class TranscriptReplayInput(ReplayInput):
+    """ Replays recorded utterances by their transcripts instead of running speech recognition.
+    `path` is a JSONL manifest of {"audio": "x.wav", "text": "..."} lines, or a directory of x.wav files with x.txt transcripts.
+    With simulate_audio=True each query waits as long as its WAV lasts, like a user speaking it. """
+
+    def __init__(self, path, rate=None, simulate_audio=False):
+        self.entries = self.LoadManifest(path) if os.path.isfile(path) else self.LoadDirectory(path)
+        self.simulate_audio = simulate_audio
+        super().__init__([text for _, text in self.entries], rate)
+
+    @staticmethod
+    def LoadManifest(path):
+        base = os.path.dirname(path)
+        entries = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    audio = entry.get("audio")
+                    entries.append((os.path.join(base, audio) if audio else None, entry["text"].strip()))
+        return entries
+
+    @staticmethod
+    def LoadDirectory(path):
+        entries = []
+        for name in sorted(os.listdir(path)):
+            if name.lower().endswith(".wav"):
+                transcript = os.path.join(path, os.path.splitext(name)[0] + ".txt")
+                if os.path.exists(transcript):
+                    with open(transcript, "r", encoding="utf-8") as f:
+                        entries.append((os.path.join(path, name), f.read().strip()))
+        return entries
+
+    def Delay(self, index):
+        audio = self.entries[index][0]
+        if not self.simulate_audio or not audio or not os.path.exists(audio):
+            return 0.0
+        with wave.open(audio, "rb") as w:
+            return w.getnframes() / float(w.getframerate())
@@ -0,0 +1,208 @@
+import argparse  # Import argparse for the benchmark command line.
+import json  # Import json to read the labeled corpus.
+import os  # Import os for the corpus path.
+import re  # Import re for the precompiled matchers.
+import time  # Import time to measure throughput.
+
+# Keyword cues per realtime intent as (pattern, weight). Longer phrases come first so they win the alternation.
+IntentCues = {
+    "weather": [(r"weather", 3), (r"temperature", 3), (r"forecast", 3), (r"climate", 2), (r"humidity|humid", 2), (r"rain(?:ing|y)?|snow(?:ing)?|sunny", 2)],
+    "news": [(r"latest news|breaking news", 4), (r"news", 3), (r"headlines?", 3)],
+    "cricket": [(r"cricket", 3), (r"test match|ipl|odi|t20", 3), (r"[a-z]+ (?:vs|versus) [a-z]+", 3), (r"wickets?|innings|batting|bowling", 2), (r"last match", 2), (r"score", 1), (r"match", 1), (r"result", 1), (r"won", 1)],
+    "stocks": [(r"share price|stock price|stock market", 4), (r"stocks?", 3), (r"ticker", 3), (r"shares?", 2), (r"nasdaq|nyse|sensex|nifty", 2), (r"price", 1)],
+    "trending": [(r"what's trending|trending", 3), (r"popular (?:right )?now", 3), (r"viral", 2)],
+}
+
+def CompileCues(cues):
+    # One alternation with a named group per cue, so a single scan finds every cue in the prompt.
+    parts, weights = [], {}
+    for intent, entries in cues.items():
+        for i, (pattern, weight) in enumerate(entries):
+            name = f"{intent}_{i}"
+            parts.append(f"(?P<{name}>{pattern})")
+            weights[name] = (intent, weight)
+    return re.compile(r"\b(?:" + "|".join(parts) + r")\b"), weights
+
+CuePattern, CueWeights = CompileCues(IntentCues)
+
+# Entities. They only add weight to an intent that already has a cue, so "apple pie" never becomes a stock query.
+CompanyTickers = {
+    "apple": "AAPL", "microsoft": "MSFT", "google": "GOOGL", "alphabet": "GOOGL", "amazon": "AMZN",
+    "tesla": "TSLA", "nvidia": "NVDA", "meta": "META", "facebook": "META", "netflix": "NFLX", "intel": "INTC",
+    "amd": "AMD", "ibm": "IBM", "infosys": "INFY", "wipro": "WIT", "reliance": "RELIANCE.BSE", "tcs": "TCS.BSE",
+}
+CricketTeams = [
+    "india", "australia", "england", "pakistan", "south africa", "new zealand", "sri lanka", "bangladesh",
+    "afghanistan", "west indies", "ireland", "zimbabwe", "netherlands",
+    "chennai super kings", "csk", "mumbai indians", "royal challengers bangalore", "royal challengers bengaluru", "rcb",
+    "kolkata knight riders", "kkr", "sunrisers hyderabad", "srh", "rajasthan royals", "delhi capitals",
+    "punjab kings", "pbks", "lucknow super giants", "lsg", "gujarat titans",
+]
+CompanyPattern = re.compile(r"\b(" + "|".join(sorted(CompanyTickers, key=len, reverse=True)) + r")\b")
+TeamPattern = re.compile(r"\b(" + "|".join(sorted(CricketTeams, key=len, reverse=True)) + r")\b")
+SymbolPattern = re.compile(r"\b(?:ticker|symbol|stock|shares?) (?:of |for )?([a-z]{1,5})\b(?! (?:of|for)\b)|\b([a-z]{1,5}) (?:stock|shares?)\b")
+CityPattern = re.compile(r"\b(?:in|at|for|of) (?:the )?([a-z][a-z .'-]*?)$")
+CityBeforeCuePattern = re.compile(r"^(?:what(?:'?s| is) (?:the )?)?([a-z][a-z .'-]*?)(?:'s)? (?:weather|temperature|forecast)\b")
+# Time and filler words that trail a city name: "weather in delhi tomorrow please".
+CityTrailingFiller = re.compile(r"(?:(?:^| )(?:today|tomorrow|tonight|now|right now|currently|outside|this week|this weekend|please))+$")
+NewsTopicPattern = re.compile(r"\b(?:about|on|for|regarding) (?:the )?([a-z0-9][a-z0-9 .'-]*?)$")
+NewsPrefixPattern = re.compile(r"\b([a-z0-9]+) (?:news|headlines)\b")
+
+# Words that are never entities on their own.
+StopWords = {
+    "the", "a", "an", "of", "for", "in", "at", "on", "is", "it", "me", "my", "today", "todays", "today's", "current",
+    "latest", "now", "this", "that", "what", "whats", "what's", "some", "any", "top", "breaking", "world's", "city",
+    "price", "stock", "share", "shares", "market", "tell", "show", "give",
+    "how", "will", "does", "do", "was", "tomorrow", "tonight", "outside", "here", "there", "like", "weather", "temperature", "forecast", "going", "be",
+}
+
+# Cue score that counts as a clear signal on its own, and the confidence needed to skip the LLM fallback.
+StrongScore = 3
+ConfidenceThreshold = 0.6
+
+class IntentMatch:
+    """ A detected realtime intent with its parameter, extracted entities and a confidence in [0, 1]. """
+
+    def __init__(self, intent, parameter, confidence, entities):
+        self.intent = intent  # "weather", "news", "cricket", "stocks", "trending" or "none".
+        self.parameter = parameter  # City, news topic, team or ticker (None if not needed or not found).
+        self.confidence = confidence
+        self.entities = entities  # {"city": ..., "team": ..., "ticker": ...} for whatever was found.
+
+    def __repr__(self):
+        return f"IntentMatch({self.intent!r}, {self.parameter!r}, {self.confidence:.2f}, {self.entities!r})"
+
+def NormalizePrompt(prompt: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[?!.,]+", " ", prompt.lower())).strip()
+
+def Entity(value):
+    value = (value or "").strip()
+    return value if value and value not in StopWords else None
+
+def CityEntity(value):
+    # A city candidate without trailing time/filler words, or None if only stop words are left ("whats the").
+    value = CityTrailingFiller.sub("", re.sub(r"^(?:the )?(?:city of )?|(?: city)$", "", (value or "").strip())).strip()
+    words = value.split()
+    return value if words and not all(word in StopWords for word in words) else None
+
+def ExtractEntities(text: str) -> dict:
+    entities = {}
+
+    for pattern in (CityPattern, CityBeforeCuePattern):
+        match = pattern.search(text)
+        if match and CityEntity(match.group(1)):
+            entities["city"] = CityEntity(match.group(1))
+            break
+
+    match = TeamPattern.search(text)
+    if match:
+        entities["team"] = match.group(1)
+
+    match = CompanyPattern.search(text)
+    if match:
+        entities["ticker"] = CompanyTickers[match.group(1)]
+    else:
+        for match in SymbolPattern.finditer(text):
+            symbol = Entity(match.group(1) or match.group(2))
+            if symbol:
+                entities["ticker"] = symbol.upper()
+                break
+
+    # "news about elections" first, then "sports news".
+    for pattern in (NewsTopicPattern, NewsPrefixPattern):
+        match = pattern.search(text)
+        if match and Entity(match.group(1)):
+            entities["topic"] = match.group(1)
+            break
+
+    return entities
+
+def MatchIntent(prompt: str) -> IntentMatch:
+    """ Score every intent in one pass over the prompt and pick the best, with a confidence from its margin. """
+    text = NormalizePrompt(prompt)
+    scores = {}
+    for match in CuePattern.finditer(text):
+        intent, weight = CueWeights[match.lastgroup]
+        scores[intent] = scores.get(intent, 0) + weight
+
+    entities = ExtractEntities(text)
+    if "weather" in scores and "city" in entities:
+        scores["weather"] += 1
+    if "cricket" in scores and "team" in entities:
+        scores["cricket"] += 1
+    if "stocks" in scores and "ticker" in entities:
+        scores["stocks"] += 2
+
+    if not scores:
+        return IntentMatch("none", None, 0.0, entities)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    intent, top = ranked[0]
+    second = ranked[1][1] if len(ranked) > 1 else 0
+    # Strong enough on its own, and well ahead of the runner-up.
+    confidence = min(1.0, top / StrongScore) * top / (top + second)
+
+    parameter = {
+        "weather": entities.get("city"),
+        "news": entities.get("topic") or "latest",
+        "cricket": entities.get("team"),
+        "stocks": entities.get("ticker"),
+    }.get(intent)
+    if intent in ("weather", "stocks") and parameter is None:
+        confidence = min(confidence, 0.5)  # The provider cannot answer without its parameter.
+
+    return IntentMatch(intent, parameter, confidence, entities)
+
+# Labeled corpus of realtime queries: one {"text", "intent", "parameter"} object per line.
+CorpusPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Files", "IntentCorpus.jsonl")
+
+def LoadCorpus(path: str = CorpusPath) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def RunBenchmark(corpus: list, repeat: int = 200) -> dict:
+    """ Throughput and accuracy of MatchIntent on a labeled corpus. Low-confidence results count as LLM fallbacks. """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in corpus:
+            MatchIntent(item["text"])
+    elapsed = time.perf_counter() - start
+
+    confident = correct = parameters = 0
+    errors = []
+    for item in corpus:
+        result = MatchIntent(item["text"])
+        if result.intent != "none" and result.confidence < ConfidenceThreshold:
+            continue  # Would go to the LLM.
+        confident += 1
+        if result.intent == item["intent"]:
+            correct += 1
+            if (result.parameter or "").lower() == (item.get("parameter") or "").lower():
+                parameters += 1
+            else:
+                errors.append((item["text"], f"parameter {result.parameter!r}, expected {item.get('parameter')!r}"))
+        else:
+            errors.append((item["text"], f"{result.intent}, expected {item['intent']}"))
+
+    return {
+        "queries": len(corpus),
+        "queries_per_second": len(corpus) * repeat / elapsed if elapsed else 0.0,
+        "fallback_rate": 1 - confident / len(corpus) if corpus else 0.0,
+        "intent_accuracy": correct / confident if confident else 0.0,
+        "parameter_accuracy": parameters / correct if correct else 0.0,
+        "errors": errors,
+    }
+
+# Entry point: benchmark the matcher on the labeled corpus.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the realtime intent matcher on a labeled corpus.")
+    parser.add_argument("corpus", nargs="?", default=CorpusPath, help="JSONL corpus of {text, intent, parameter}")
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the corpus for the throughput figure")
+    args = parser.parse_args()
+
+    report = RunBenchmark(LoadCorpus(args.corpus), args.repeat)
+    print(f"{report['queries']} queries, {report['queries_per_second']:,.0f} queries/s")
+    print(f"LLM fallback rate: {report['fallback_rate']:.1%}")
+    print(f"Intent accuracy (confident): {report['intent_accuracy']:.1%}, parameter accuracy: {report['parameter_accuracy']:.1%}")
+    for text, problem in report["errors"]:
+        print(f"  {text!r}: {problem}")
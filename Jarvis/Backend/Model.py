@@ -5,6 +5,17 @@ except ImportError:
 
 from rich import print  # Import the Rich library to enhance terminal outputs.
 from dotenv import dotenv_values  # Import dotenv to load environment variables.
+from Backend.FastPath import FastPathDecision, FastPathReport  # Import the local rule-based classifier.
+from Backend.Cache import LRUCache  # Import the LRU/TTL cache used for repeated decisions.
+from Backend.RateLimit import GetGuard, ProviderThrottled, IsRateLimited, QuotaState  # Import the per-provider rate limiter and circuit breaker.
+import os  # Import os for the cache file path.
+import re  # Import re to normalize cache keys.
+import queue  # Import queue to race the Cohere and Groq classifiers.
+import random  # Import random for jittered retry backoff.
+import threading  # Import threading to run the classifiers in the background.
+import time  # Import time for the retry latency budget.
+from collections import OrderedDict  # Import OrderedDict to keep the most recent speculative decisions.
+from concurrent.futures import Future  # Import Future to hand speculative decisions to the final request.
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values(".env")
@@ -20,6 +31,38 @@ if cohere and CohereAPIKey:
     except Exception as e:
         print(f"Error initializing Cohere: {e}")
 
+# Reuse the Groq client from the chatbot for hedged classification requests.
+try:
+    from Backend.Chatbot import client as groq_client
+except Exception as e:
+    print(f"Groq hedge unavailable: {e}")
+    groq_client = None
+
+# Retry policy: maximum attempts, base of the jittered exponential backoff and the overall latency budget (seconds).
+MaxAttempts = int(env_vars.get("DecisionMaxAttempts") or 3)
+BackoffBase = float(env_vars.get("DecisionBackoffBase") or 0.25)
+LatencyBudget = float(env_vars.get("DecisionLatencyBudget") or 8.0)
+
+# Hedging: if Cohere has produced nothing after HedgeAfter seconds, fire the same classification at Groq.
+HedgeEnabled = (env_vars.get("DecisionHedge") or "True").lower() == "true" and groq_client is not None
+HedgeAfter = float(env_vars.get("DecisionHedgeAfter") or 1.5)
+
+# Cache Cohere decisions so repeated commands skip the remote round-trip (size, TTL in seconds, persistence).
+DecisionCache = LRUCache(
+    max_size=int(env_vars.get("DecisionCacheSize") or 512),
+    ttl=float(env_vars.get("DecisionCacheTTL") or 6 * 3600),
+    path=os.path.join("Data", "DecisionCache.json") if (env_vars.get("DecisionCachePersist") or "True").lower() == "true" else None
+)
+
+# Speculative decisions started from stable partial transcripts, keyed like the decision cache.
+Speculations = OrderedDict()
+MaxSpeculations = 4
+_speculation_lock = threading.Lock()
+_speculation_running = None  # The Future of the one speculative classification allowed in flight.
+
+# Speculate only while Cohere has this many calls to spare, so the final query never finds the quota used up.
+SpeculationReserve = int(env_vars.get("SpeculationReserve") or 5)
+
 # Define a list of recognized function keywords for task categorization.
 funcs = [
     "exit", "general", "realtime", "open", "close", "play",
@@ -66,71 +109,229 @@ ChatHistory = [
     {"role": "Chatbot", "message": "general chat with me."}
 ]
 
-# Define the main function for decision-making on queries.
-def FirstLayerDMM(prompt: str = "test"):
+# Normalize a query the way QueryModifier does so "Open youtube." and "open youtube" share a cache entry.
+def DecisionKey(prompt: str) -> str:
+    key = re.sub(r"\s+", " ", prompt.lower().strip())
+    return key.rstrip(".?! ")
+
+# Keep a task only if it starts with one of the recognized function keywords.
+def FilterTask(task: str):
+    task = task.strip()
+    if any(task.startswith(func) for func in funcs):
+        return task
+    return None
+
+# Classify with Cohere, yielding each task as soon as its comma-delimited segment is complete.
+def CohereTasks(prompt: str):
+    # Create a streaming chat session with the Cohere model.
+    stream = co.chat_stream(
+        model='command-a-03-2025',  # Specify the Cohere model to use.
+        message=prompt,         # Pass the user's query.
+        temperature=0.7,        # Set the creativity level of the model.
+        chat_history=ChatHistory,  # Provide the predefined chat history for context.# type: ignore 
+        prompt_truncation="OFF",  # Ensure the prompt is not truncated.
+        connectors=[],            # No additional connectors are used.
+        preamble=preamble         # Pass the detailed instruction preamble.
+    )
+
+    # Text received so far that does not yet end with a comma.
+    pending = ""
+
+    # Iterate over events in the stream and emit every completed segment right away.
+    for event in stream:
+        if event.event_type == "text-generation":
+            pending += event.text.replace("\n", "")  # Append generated text without newlines.
+            while "," in pending:
+                segment, pending = pending.split(",", 1)
+                task = FilterTask(segment)
+                if task:
+                    yield task
+
+    # The last segment has no trailing comma.
+    task = FilterTask(pending)
+    if task:
+        yield task
+
+# Classify with Groq using the same preamble and examples (used as the hedged request).
+def GroqTasks(prompt: str):
+    history = [{"role": "user" if m["role"] == "User" else "assistant", "content": m["message"]} for m in ChatHistory]
+    completion = groq_client.chat.completions.create(
+        model="llama-3.1-8b-instant",
+        messages=[{"role": "system", "content": preamble}] + history + [{"role": "user", "content": prompt}],
+        max_tokens=256,
+        temperature=0.7,
+        stream=False
+    )
+    response = completion.choices[0].message.content.replace("\n", "")
+    return [task for task in (FilterTask(segment) for segment in response.split(",")) if task]
+
+# Run Cohere, start Groq if Cohere is silent past the hedge deadline, and yield the tasks of whichever answers first.
+def RaceClassifiers(prompt: str, deadline: float):
+    events = queue.Queue()  # (source, kind, value) tuples from the classifier threads.
+
+    def Run(source, produce):
+        # A throttled provider fails instantly, so the race moves on to the other one without waiting.
+        guard = GetGuard(source)
+        try:
+            guard.Check()
+            for task in produce(prompt):
+                events.put((source, "task", task))
+            guard.Success()
+            events.put((source, "done", None))
+        except ProviderThrottled as e:
+            events.put((source, "error", e))
+        except Exception as e:
+            guard.Failure(rate_limited=IsRateLimited(e))
+            events.put((source, "error", e))
+
+    threading.Thread(target=Run, args=("cohere", CohereTasks), daemon=True).start()
+    started = {"cohere"}
+    failed = {}
+    winner = None
+    hedge_at = time.time() + HedgeAfter if HedgeEnabled else None
+
+    while True:
+        now = time.time()
+        # Fire the hedged request once the deadline passes without any task from Cohere.
+        if hedge_at is not None and winner is None and now >= hedge_at and "groq" not in started:
+            print("No decision from Cohere yet, hedging with Groq.")
+            threading.Thread(target=Run, args=("groq", GroqTasks), daemon=True).start()
+            started.add("groq")
+
+        wait_until = deadline if "groq" in started or hedge_at is None else min(hedge_at, deadline)
+        if now >= deadline:
+            raise TimeoutError("decision latency budget exceeded")
+
+        try:
+            source, kind, value = events.get(timeout=max(0.0, wait_until - now))
+        except queue.Empty:
+            continue
+
+        if winner is not None and source != winner:
+            continue  # The other classifier lost the race.
+
+        if kind == "task":
+            winner = source
+            yield value
+        elif kind == "done":
+            return
+        else:
+            failed[source] = value
+            if winner is not None or set(failed) == started and (hedge_at is None or "groq" in started):
+                raise value
+            # Cohere failed before producing anything: hedge immediately instead of waiting.
+            hedge_at = now if hedge_at is not None else None
+
+# Streaming decision-making: yield each task as soon as its comma-delimited segment is complete.
+# A speculative run (on a partial transcript) leaves the fast-path and cache counters and the message log alone,
+# so every utterance is counted once, by its final query.
+def FirstLayerDMMStream(prompt: str = "test", speculative: bool = False):
+    # Resolve unambiguous commands locally and skip the Cohere round-trip entirely.
+    local_decision = FastPathDecision(prompt, record=not speculative)
+    if local_decision is not None:
+        yield from local_decision
+        return
+
+    # Reuse a decision started speculatively on a partial transcript that matches the final one.
+    with _speculation_lock:
+        speculation = Speculations.pop(DecisionKey(prompt), None) if not speculative else None
+    if speculation is not None:
+        try:
+            decision = speculation.result(timeout=LatencyBudget)
+            messages.append({"role": "user", "content": f"{prompt}"})
+            yield from decision
+            return
+        except Exception as e:
+            print(f"Speculative decision unusable: {e}")
+
+    # Reuse a previous Cohere decision for the same normalized query.
+    cached_decision = DecisionCache.Get(DecisionKey(prompt), record=not speculative)
+    if cached_decision is not None:
+        yield from cached_decision
+        return
+
     # If Cohere client is not initialized, return a default 'general' decision.
     if co is None:
         print("Cohere not initialized. Defaulting to 'general'.")
-        return [f"general {prompt}"]
+        yield f"general {prompt}"
+        return
 
     # Add the user's query to the messages list.
-    messages.append({"role": "user", "content": f"{prompt}"})
+    if not speculative:
+        messages.append({"role": "user", "content": f"{prompt}"})
 
-    # Create a streaming chat session with the Cohere model.
-    try:
-        stream = co.chat_stream(
-            model='command-a-03-2025',  # Specify the Cohere model to use.
-            message=prompt,         # Pass the user's query.
-            temperature=0.7,        # Set the creativity level of the model.
-            chat_history=ChatHistory,  # Provide the predefined chat history for context.# type: ignore 
-            prompt_truncation="OFF",  # Ensure the prompt is not truncated.
-            connectors=[],            # No additional connectors are used.
-            preamble=preamble         # Pass the detailed instruction preamble.
-        )
-    except Exception as e:
-        print(f"Error in FirstLayerDMM (Cohere): {e}")
-        return [f"general {prompt}"]
+    deadline = time.time() + LatencyBudget
+    tasks = []
 
-    # Initialize an empty string to store the generated response.
-    response = ""
+    for attempt in range(MaxAttempts):
+        try:
+            for task in RaceClassifiers(prompt, deadline):
+                if "(query)" in task:
+                    raise ValueError(f"model echoed the placeholder: {task}")
+                tasks.append(task)
+                yield task
+            if tasks:
+                break
+            raise ValueError("model returned no recognized task")
+        except Exception as e:
+            print(f"Error in FirstLayerDMM (attempt {attempt + 1}/{MaxAttempts}): {e}")
+            if tasks:
+                return  # Tasks already dispatched cannot be taken back, keep the partial decision.
+            if isinstance(e, ProviderThrottled):
+                break  # Retrying cannot help until the quota refills, fall back right away.
 
-    # Iterate over events in the stream and capture text generation events.
-    try:
-        for event in stream:
-            if event.event_type == "text-generation":
-                response += event.text  # Append generated text to the response.
-    except Exception as e:
-        print(f"Error during stream iteration (Cohere 429?): {e}")
-        return [f"general {prompt}"]
-
-    # Remove newline characters and split responses into individual tasks.
-    response = response.replace("\n", "")
-    response = response.split(",")
-
-    # Strip leading and trailing whitespaces from each task.
-    response = [i.strip() for i in response]
-
-    # Initialize an additional section here (if required by the rest of the code).
-    temp = []
-    # Filter the tasks based on recognized function keywords.
-    for task in response:
-        for func in funcs:
-            if task.startswith(func):
-                temp.append(task)  # Add valid tasks to the filtered list.
-
-    # Update the response with the filtered list of tasks.
-    response = temp
-
-    # If "(query)" is in the response, recursively call the function for further clarification.
-    if "(query)" in response:
-        newresponse = FirstLayerDMM(prompt=prompt)
-        return newresponse  # Return the clarified response.
-    else:
-        # Return the filtered response.
-        return response
+        # Jittered exponential backoff, but never past the latency budget.
+        delay = BackoffBase * (2 ** attempt) * random.uniform(0.5, 1.5)
+        if attempt + 1 >= MaxAttempts or time.time() + delay >= deadline:
+            break
+        time.sleep(delay)
+
+    if not tasks:
+        print("Decision retries exhausted. Defaulting to 'general'.")
+        yield f"general {prompt}"
+        return
+
+    # Remember real decisions only.
+    DecisionCache.Set(DecisionKey(prompt), tasks)
+
+# Define the main function for decision-making on queries.
+def FirstLayerDMM(prompt: str = "test"):
+    # Collect the streamed tasks into a list.
+    return list(FirstLayerDMMStream(prompt))
+
+# Start classifying a stable partial transcript in the background; FirstLayerDMMStream reuses it if the final query matches.
+def SpeculateDecision(prompt: str):
+    global _speculation_running
+    key = DecisionKey(prompt)
+    with _speculation_lock:
+        if not key or key in Speculations:
+            return
+        # One speculation in flight at a time: newer prefixes are ignored until it finishes, since a superseded
+        # Cohere call cannot be stopped and would still use up quota.
+        if _speculation_running is not None and not _speculation_running.done():
+            return
+        # Commands the fast path or the cache resolve need no Cohere call; others only if the quota has room to spare.
+        remote = FastPathDecision(prompt, record=False) is None and DecisionCache.Get(key, record=False) is None
+        if remote and not GetGuard("cohere").Available(reserve=SpeculationReserve):
+            return
+        future = Future()
+        _speculation_running = future
+        Speculations[key] = future
+        while len(Speculations) > MaxSpeculations:
+            Speculations.popitem(last=False)
+
+    def Run():
+        try:
+            future.set_result(list(FirstLayerDMMStream(prompt, speculative=True)))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=Run, daemon=True).start()
 
 # Entry point for the script.
 if __name__ == "__main__":
     # Continuously prompt the user for input and process it.
     while True:
-        print(FirstLayerDMM(input(">>>")))  # Print the categorized response.
\ No newline at end of file
+        print(FirstLayerDMM(input(">>>")))  # Print the categorized response.
+        print(FastPathReport(), DecisionCache.Stats())  # Show how much traffic the fast path and cache absorbed.
+        print(QuotaState())  # Show the remaining Cohere and Groq quota.
\ No newline at end of file
@@ -0,0 +1,127 @@
+import threading  # Import threading since providers are called from several worker threads.
+import time  # Import time for token refill and breaker timeouts.
+
+class ProviderThrottled(Exception):
+    """ Raised instead of calling a provider whose quota is used up or whose circuit breaker is open. """
+
+class TokenBucket:
+    """ Allows `capacity` calls per `period` seconds, refilled continuously. """
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period  # Tokens added per second.
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def Refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def WaitTime(self, tokens: float = 1) -> float:
+        # Seconds until `tokens` tokens are available (0 if they are available now).
+        self.Refill()
+        return 0.0 if self.tokens >= tokens else (tokens - self.tokens) / self.rate
+
+class ProviderGuard:
+    """ Token-bucket admission plus a circuit breaker for one provider.
+    The breaker opens after `failure_threshold` consecutive failures (or at once on a 429), rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through to decide whether to close again. """
+
+    def __init__(self, name: str, limits: dict, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.name = name
+        self.buckets = {label: TokenBucket(capacity, period) for label, (capacity, period) in limits.items()}
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"  # "closed", "open" or "half-open".
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _Rejection(self, reserve: int = 0):
+        # Why a call would be rejected right now (or leave fewer than `reserve` calls), or None if it would be admitted.
+        if self.state == "open":
+            if time.monotonic() < self.open_until:
+                return f"{self.name} circuit open for another {self.open_until - time.monotonic():.0f}s"
+            self.state = "half-open"
+        if self.state == "half-open" and self.trial_in_flight:
+            return f"{self.name} is being retried after failures"
+        for label, bucket in self.buckets.items():
+            wait = bucket.WaitTime(1 + reserve)
+            if wait > 0:
+                return f"{self.name} {label} quota used up, next call in {wait:.0f}s"
+        return None
+
+    def Available(self, reserve: int = 0) -> bool:
+        # Would a call be admitted with `reserve` calls to spare? Does not use up a token.
+        with self._lock:
+            return self._Rejection(reserve) is None
+
+    def Check(self):
+        # Admit one call or raise ProviderThrottled immediately.
+        with self._lock:
+            reason = self._Rejection()
+            if reason:
+                raise ProviderThrottled(reason)
+            for bucket in self.buckets.values():
+                bucket.tokens -= 1
+            if self.state == "half-open":
+                self.trial_in_flight = True
+
+    def Success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def Failure(self, rate_limited: bool = False):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if rate_limited or self.state == "half-open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.open_until = time.monotonic() + self.reset_timeout
+
+    def State(self) -> dict:
+        with self._lock:
+            self._Rejection()  # Moves an expired open breaker to half-open.
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "retry_in": max(0.0, self.open_until - time.monotonic()) if self.state == "open" else 0.0,
+                "quota": {label: int(bucket.tokens) for label, bucket in self.buckets.items()},
+            }
+
+Minute, Day = 60, 24 * 3600
+
+# Free-tier limits per provider as {label: (calls, period in seconds)}; the daily ones refill gradually.
+ProviderLimits = {
+    "cohere": {"minute": (20, Minute)},
+    "groq": {"minute": (30, Minute), "day": (14400, Day)},
+    "openweathermap": {"minute": (60, Minute), "day": (1000, Day)},
+    "gnews": {"minute": (60, Minute), "day": (100, Day)},
+    "cricapi": {"day": (100, Day)},
+    "alphavantage": {"minute": (5, Minute), "day": (25, Day)},
+    "googletrends": {"minute": (10, Minute)},
+}
+
+Guards = {name: ProviderGuard(name, limits) for name, limits in ProviderLimits.items()}
+_guards_lock = threading.Lock()
+
+def GetGuard(name: str) -> ProviderGuard:
+    # Providers without configured limits still get a circuit breaker.
+    with _guards_lock:
+        if name not in Guards:
+            Guards[name] = ProviderGuard(name, {})
+        return Guards[name]
+
+def QuotaState() -> dict:
+    # Breaker state and remaining calls for every provider.
+    with _guards_lock:
+        guards = list(Guards.values())
+    return {guard.name: guard.State() for guard in guards}
+
+def IsRateLimited(error: Exception) -> bool:
+    # Cohere and Groq SDK errors carry the HTTP status; fall back to the message for others.
+    return getattr(error, "status_code", None) == 429 or "429" in str(error) or "rate limit" in str(error).lower()
@@ -1,11 +1,16 @@
-import requests
 from groq import Groq
 import datetime
 from dotenv import dotenv_values
-import re
-import os
 import json
-from typing import Dict, List, Optional, Tuple
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Tuple
+from Backend.ChatLogStore import ChatLog
+from Backend.Cache import StaleWhileRevalidateCache
+from Backend.HttpClient import HttpGet
+from Backend.RateLimit import GetGuard, ProviderThrottled, IsRateLimited
+from Backend.IntentMatcher import MatchIntent, ConfidenceThreshold
 
 # Try to import optional dependencies safely
 try:
@@ -45,54 +50,145 @@ SystemChatBot = [
     {"role": "assistant", "content": "Hello, how can I help you?"}
 ]
 
+# ========== PROVIDER CACHE ==========
+class ProviderUnavailable(Exception):
+    """A provider call failed; `fallback` is returned to the caller instead and nothing is cached."""
+    def __init__(self, fallback):
+        super().__init__(fallback)
+        self.fallback = fallback
+
+# TTL per provider (seconds): stale entries are served for as long again while a background refresh runs
+ProviderCacheTTL = {
+    "weather": float(env_vars.get("WeatherCacheTTL") or 600),
+    "news": float(env_vars.get("NewsCacheTTL") or 600),
+    "cricket": float(env_vars.get("CricketCacheTTL") or 20),
+    "stocks": float(env_vars.get("StockCacheTTL") or 60),
+    "exchange_rate": float(env_vars.get("ExchangeRateCacheTTL") or 6 * 3600),
+    "trending": float(env_vars.get("TrendsCacheTTL") or 1800),
+}
+ProviderCaches = {name: StaleWhileRevalidateCache(ttl) for name, ttl in ProviderCacheTTL.items()}
+
+def Cached(cache: str, provider: str):
+    """Serve a provider function from its response cache, keyed on its (case-insensitive) arguments.
+    Calls that reach the provider must pass its rate limiter and circuit breaker first; a throttled
+    provider raises ProviderThrottled at once (or keeps serving a stale entry while it recovers)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = tuple(str(arg).strip().lower() for arg in args)
+
+            def Load():
+                GetGuard(provider).Check()
+                return func(*args)
+
+            try:
+                return ProviderCaches[cache].Fetch(key, Load)
+            except ProviderUnavailable as e:
+                return e.fallback
+        return wrapper
+    return decorator
+
+def ProviderGet(provider: str, url: str):
+    """GET a provider's JSON and report the outcome to its circuit breaker"""
+    guard = GetGuard(provider)
+    try:
+        response = HttpGet(url, timeout=10)
+    except Exception:
+        guard.Failure()
+        raise
+    if response.status_code == 429 or response.status_code >= 500:
+        guard.Failure(rate_limited=response.status_code == 429)
+    else:
+        guard.Success()
+    return response.json()
+
+def ProviderCacheStats() -> Dict[str, dict]:
+    """Hits, stale hits and misses per provider"""
+    return {name: cache.Stats() for name, cache in ProviderCaches.items()}
+
+# ========== PROVIDER FAN-OUT ==========
+# Independent provider calls run concurrently; a composite answer waits at most ProviderDeadline seconds
+ProviderPool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="provider")
+ProviderDeadline = float(env_vars.get("RealtimeDeadline") or 6)
+
+def FanOut(calls: Dict[str, Callable], deadline: float = None) -> Dict[str, object]:
+    """Run the calls concurrently and return the results that arrived before the deadline.
+    Late calls keep running in the background and still fill the provider cache for the next query."""
+    deadline = ProviderDeadline if deadline is None else deadline
+    futures = {name: ProviderPool.submit(call) for name, call in calls.items()}
+    done, _ = wait(futures.values(), timeout=deadline)
+    results = {}
+    for name, future in futures.items():
+        if future not in done:
+            print(f"Provider {name} missed the {deadline}s deadline, answering without it.")
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"Error in provider {name}: {e}")
+    return results
+
 # ========== WEATHER FUNCTION ==========
+@Cached("weather", "openweathermap")
 def get_weather(city: str) -> str:
-    if not OpenWeatherMapKey: return "Weather API key missing."
+    if not OpenWeatherMapKey: raise ProviderUnavailable("Weather API key missing.")
     url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={OpenWeatherMapKey}&units=metric"
     try:
-        response = requests.get(url, timeout=10).json()
-        if str(response.get("cod")) == "200":
-            weather = response["weather"][0]["description"]
-            temp = response["main"]["temp"]
-            feels_like = response["main"]["feels_like"]
-            humidity = response["main"]["humidity"]
-            return f"🌤️ The current weather in {city.title()} is {weather.capitalize()} with a temperature of {temp}°C (feels like {feels_like}°C) and {humidity}% humidity."
-        
-        # More descriptive errors
-        if str(response.get("cod")) == "404":
-            return f"Sorry, I couldn't find weather data for '{city}'. Please check the city name."
-        elif str(response.get("cod")) == "401":
-            return "Invalid Weather API Key. Please update your .env file."
-        return f"Weather Error: {response.get('message', 'Unknown error')}"
+        response = ProviderGet("openweathermap", url)
     except Exception as e:
-        return f"Error fetching weather: {e}"
+        raise ProviderUnavailable(f"Error fetching weather: {e}")
+
+    if str(response.get("cod")) == "200":
+        weather = response["weather"][0]["description"]
+        temp = response["main"]["temp"]
+        feels_like = response["main"]["feels_like"]
+        humidity = response["main"]["humidity"]
+        return f"🌤️ The current weather in {city.title()} is {weather.capitalize()} with a temperature of {temp}°C (feels like {feels_like}°C) and {humidity}% humidity."
+
+    # More descriptive errors
+    if str(response.get("cod")) == "404":
+        return f"Sorry, I couldn't find weather data for '{city}'. Please check the city name."
+    elif str(response.get("cod")) == "401":
+        raise ProviderUnavailable("Invalid Weather API Key. Please update your .env file.")
+    raise ProviderUnavailable(f"Weather Error: {response.get('message', 'Unknown error')}")
 
 # ========== NEWS FUNCTION ==========
+@Cached("news", "gnews")
 def get_news(query: str = "latest") -> str:
-    if not GNewsAPIKey: return "News API key missing."
+    if not GNewsAPIKey: raise ProviderUnavailable("News API key missing.")
     url = f"https://gnews.io/api/v4/search?q={query}&token={GNewsAPIKey}&lang=en&max=5"
     try:
-        response = requests.get(url, timeout=10).json()
-        articles = response.get("articles", [])
-        if articles:
-            news_str = f"📰 Latest news headlines for '{query}':\n"
-            for i, article in enumerate(articles, 1):
-                news_str += f"{i}. {article['title']} - {article['source']['name']}\n"
-            return news_str
-        return "No news found for your query."
+        response = ProviderGet("gnews", url)
     except Exception as e:
-        return f"Error fetching news: {e}"
+        raise ProviderUnavailable(f"Error fetching news: {e}")
+
+    articles = response.get("articles", [])
+    if articles:
+        news_str = f"📰 Latest news headlines for '{query}':\n"
+        for i, article in enumerate(articles, 1):
+            news_str += f"{i}. {article['title']} - {article['source']['name']}\n"
+        return news_str
+    raise ProviderUnavailable("No news found for your query.")  # Also what a quota error looks like, so not cached.
 
 # ========== CRICKET FUNCTION ==========
-def get_cricket_scores(query: str = None) -> str:
-    if not CricAPIKey: return "Cricket API key missing."
+@Cached("cricket", "cricapi")
+def get_current_matches():
+    """All current matches in one call, shared by every cricket query; a message string if the provider failed"""
+    if not CricAPIKey: raise ProviderUnavailable("Cricket API key missing.")
     url = f"https://api.cricapi.com/v1/currentMatches?apikey={CricAPIKey}&offset=0"
     try:
-        response = requests.get(url, timeout=10).json()
-        matches = response.get("data", [])
-        if not matches:
-            return "No cricket match data available at the moment."
-        
+        matches = ProviderGet("cricapi", url).get("data", [])
+    except Exception as e:
+        raise ProviderUnavailable(f"Error fetching cricket scores: {e}")
+    if not matches:
+        raise ProviderUnavailable("No cricket match data available at the moment.")
+    return matches
+
+def get_cricket_scores(query: str = None) -> str:
+    matches = get_current_matches()
+    if isinstance(matches, str):
+        return matches
+    try:
         # Categorize matches
         live_matches = [m for m in matches if "live" in m.get("status", "").lower() or "started" in m.get("status", "").lower()]
         ended_matches = [m for m in matches if "won" in m.get("status", "").lower() or "ended" in m.get("status", "").lower() or "drawn" in m.get("status", "").lower()]
@@ -121,40 +217,53 @@ def get_cricket_scores(query: str = None) -> str:
         return f"Error fetching cricket scores: {e}"
 
 # ========== CURRENCY CONVERSION ==========
+@Cached("exchange_rate", "alphavantage")
 def get_exchange_rate(from_currency="USD", to_currency="INR") -> float:
-    if not AlphaVantageKey: return 0.0
+    if not AlphaVantageKey: raise ProviderUnavailable(0.0)
     url = f"https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency={from_currency}&to_currency={to_currency}&apikey={AlphaVantageKey}"
     try:
-        response = requests.get(url, timeout=10).json()
+        response = ProviderGet("alphavantage", url)
         rate = response.get("Realtime Currency Exchange Rate", {}).get("5. Exchange Rate")
-        return float(rate) if rate else 83.5 # Fallback to a recent estimate if API fails
     except:
-        return 83.5
+        rate = None
+    if not rate:
+        raise ProviderUnavailable(83.5)  # Fallback to a recent estimate if API fails
+    return float(rate)
 
 # ========== STOCKS FUNCTION ==========
+@Cached("stocks", "alphavantage")
 def get_stock_price(symbol: str) -> str:
-    if not AlphaVantageKey: return "Stock API key missing."
+    if not AlphaVantageKey: raise ProviderUnavailable("Stock API key missing.")
+    deadline = time.monotonic() + ProviderDeadline
+    # The exchange rate does not depend on the quote, fetch both at once
+    rate_future = ProviderPool.submit(get_exchange_rate, "USD", "INR")
     url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={AlphaVantageKey}"
     try:
-        response = requests.get(url, timeout=10).json()
-        quote = response.get("Global Quote", {})
-        if quote:
-            price = quote.get("05. price")
-            change = quote.get("09. change")
-            percent = quote.get("10. change percent")
-            
-            if price:
-                usd_price = float(price)
-                inr_rate = get_exchange_rate("USD", "INR")
-                inr_price = usd_price * inr_rate
-                
-                return f"📈 Stock: {symbol.upper()}\n• Price: ₹{inr_price:,.2f} ({usd_price:.2f} USD)\n• Change: {change} ({percent})\n• Exchange Rate: 1 USD = ₹{inr_rate:.2f}"
-                
-        return f"Could not find stock data for symbol '{symbol}'."
+        response = ProviderGet("alphavantage", url)
     except Exception as e:
-        return f"Error fetching stocks: {e}"
+        raise ProviderUnavailable(f"Error fetching stocks: {e}")
+
+    quote = response.get("Global Quote", {})
+    if quote:
+        price = quote.get("05. price")
+        change = quote.get("09. change")
+        percent = quote.get("10. change percent")
+        
+        if price:
+            usd_price = float(price)
+            try:
+                inr_rate = rate_future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except (FutureTimeout, ProviderThrottled):
+                # Partial answer: the quote without the rupee conversion
+                raise ProviderUnavailable(f"📈 Stock: {symbol.upper()}\n• Price: {usd_price:.2f} USD\n• Change: {change} ({percent})")
+            inr_price = usd_price * inr_rate
+            
+            return f"📈 Stock: {symbol.upper()}\n• Price: ₹{inr_price:,.2f} ({usd_price:.2f} USD)\n• Change: {change} ({percent})\n• Exchange Rate: 1 USD = ₹{inr_rate:.2f}"
+            
+    raise ProviderUnavailable(f"Could not find stock data for symbol '{symbol}'.")  # Also returned when rate-limited.
 
 # ========== TRENDS FUNCTION ==========
+@Cached("trending", "googletrends")
 def get_trending_topics() -> str:
     if TrendReq is None:
         return "Trending topics are unavailable because 'pytrends' is not installed."
@@ -162,67 +271,41 @@ def get_trending_topics() -> str:
         pytrends = TrendReq(hl='en-US', tz=360)
         # Attempting daily trending searches for India
         trending = pytrends.trending_searches(pn='india')
-        if trending is not None and not trending.empty:
-            topics = trending[0].tolist()[:10]
-            return "🔥 Trending topics in India right now:\n" + "\n".join([f"{i+1}. {t}" for i, t in enumerate(topics)])
-        return "No trending topics found currently."
+        GetGuard("googletrends").Success()
     except Exception as e:
         print(f"Error in Trending: {e}")
+        GetGuard("googletrends").Failure(rate_limited=IsRateLimited(e))
         # Final fallback if pytrends fails completely
-        return "Trending topics are currently unavailable due to a service error."
+        raise ProviderUnavailable("Trending topics are currently unavailable due to a service error.")
+    if trending is not None and not trending.empty:
+        topics = trending[0].tolist()[:10]
+        return "🔥 Trending topics in India right now:\n" + "\n".join([f"{i+1}. {t}" for i, t in enumerate(topics)])
+    raise ProviderUnavailable("No trending topics found currently.")
 
 # ========== INTENT DETECTOR ==========
 def detect_intent(prompt: str) -> Tuple[str, Optional[str]]:
-    """Detect user intent from the prompt using regex for speed, fallback to LLM for complex queries"""
-    prompt_lower = prompt.lower()
-    
-    # Simple regex rules
-    # Simple regex rules
-    # Enhanced regex rules
-    if any(word in prompt_lower for word in ["weather", "temperature", "climate"]):
-        # Match 'in [City]', 'of [City]', etc. and strip the preposition
-        match = re.search(r"(?:in|of|weather|temperature|climate)\s+([a-zA-Z\s]+)", prompt_lower)
-        if match:
-            city = match.group(1).strip()
-            city = re.sub(r"^(in|of|the|is|at|for)\s+", "", city)
-            return "weather", city
-    
-    if any(word in prompt_lower for word in ["news", "headlines", "latest news"]):
-        match = re.search(r"(?:about|on|for)\s+([a-zA-Z0-9\s]+)", prompt_lower)
-        return "news", match.group(1).strip() if match else "latest"
-    
-    if any(word in prompt_lower for word in ["cricket", "score", "match", "result", "last match"]):
-        # Extract team/match name if present after 'of', 'between', or 'last'
-        match = re.search(r"(?:of|between|for|score|last|result)\s+([a-zA-Z\s]+)", prompt_lower)
-        if match:
-            query = match.group(1).strip()
-            query = re.sub(r"^(the|of|for|match|score|result)\s+", "", query)
-            return "cricket", query
-        return "cricket", None
-    
-    if any(word in prompt_lower for word in ["stock", "price", "share"]):
-        match = re.search(r"(?:of|for|price)\s+([a-zA-Z]+)", prompt_lower)
-        if match:
-            candidate = match.group(1).strip().upper()
-            if candidate not in ["OF", "FOR", "THE", "PRICE"]:
-                return "stocks", candidate
-    
-    if any(word in prompt_lower for word in ["trending", "popular now", "what's trending"]):
-        return "trending", None
+    """Detect user intent with the compiled matcher, fallback to LLM only for low-confidence queries"""
+    result = MatchIntent(prompt)
+    if result.intent != "none" and result.confidence >= ConfidenceThreshold:
+        return result.intent, result.parameter
 
-    # LLM Fallback for intent classification if regex fails but looks like a real-time request
-    if any(word in prompt_lower for word in ["happen", "world", "now", "live"]):
+    # LLM Fallback when the matcher found a weak cue, or the prompt still looks like a real-time request
+    prompt_lower = prompt.lower()
+    if result.intent != "none" or any(word in prompt_lower for word in ["happen", "world", "now", "live"]):
         try:
+            GetGuard("groq").Check()
             intent_system = """Return ONLY JSON: {"intent": "weather"|"news"|"cricket"|"stocks"|"trending"|"none", "parameter": "string"|null}"""
             response = client.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=[{"role": "system", "content": intent_system}, {"role": "user", "content": prompt}],
                 response_format={"type": "json_object"}
             )
-            import json
+            GetGuard("groq").Success()
             data = json.loads(response.choices[0].message.content)
             return data.get("intent", "none"), data.get("parameter")
-        except: pass
+        except ProviderThrottled: pass
+        except Exception as e:
+            GetGuard("groq").Failure(rate_limited=IsRateLimited(e))
 
     return "none", None
 
@@ -250,16 +333,13 @@ def GoogleSearch(query):
         return f"Search Error: {e}"
 
 # ========== CORE ENGINES ==========
-def original_RealtimeSearchEngine(prompt):
-    """Fallback logic using Google Search + LLM"""
+def original_RealtimeSearchEngine(prompt, OnChunk=None):
+    """Fallback logic using Google Search + LLM; OnChunk receives the answer text as it streams in"""
     global SystemChatBot
-    try:
-        if not os.path.exists("Data"): os.makedirs("Data")
-        with open(r"Data\ChatLog.json", "r", encoding='utf-8') as f:
-            messages = json.load(f)
-    except: messages = []
+    messages = ChatLog.Messages()
 
-    messages.append({"role": "user", "content": prompt})
+    UserMessage = {"role": "user", "content": prompt}
+    messages.append(UserMessage)
     search_context = GoogleSearch(prompt)
     
     temp_messages = SystemChatBot + [
@@ -280,51 +360,49 @@ def original_RealtimeSearchEngine(prompt):
         for chunk in completion:
             if chunk.choices[0].delta.content:
                 Answer += chunk.choices[0].delta.content
+                if OnChunk:
+                    OnChunk(chunk.choices[0].delta.content.replace("</s>", ""))
 
         Answer = Answer.strip().replace("</s>", "")
-        messages.append({"role": "assistant", "content": Answer})
-
-        with open(r"Data\ChatLog.json", "w", encoding='utf-8') as f:
-            json.dump(messages, f, indent=4)
+        ChatLog.Append(UserMessage, {"role": "assistant", "content": Answer})
 
         return AnswerModifier(Answer)
     except Exception as e:
         print(f"Error in RealtimeSearch: {e}")
         return f"I couldn't perform the search right now. (Error: {e})"
 
-def RealtimeSearchEngine(prompt):
-    """Primary engine with built-in intent routing to real-time APIs"""
+def RealtimeSearchEngine(prompt, OnChunk=None):
+    """Primary engine with built-in intent routing to real-time APIs; OnChunk receives the answer text as it arrives"""
     intent, parameter = detect_intent(prompt)
     
     api_result = None
-    if intent == "weather" and parameter:
-        api_result = get_weather(parameter)
-    elif intent == "news":
-        api_result = get_news(parameter if parameter else "latest")
-    elif intent == "cricket":
-        api_result = get_cricket_scores(parameter)
-    elif intent == "stocks" and parameter:
-        api_result = get_stock_price(parameter)
-    elif intent == "trending":
-        api_result = get_trending_topics()
-    elif "happening in the world" in prompt.lower():
-        api_result = f"{get_news('world')}\n\n{get_trending_topics()}"
+    try:
+        if intent == "weather" and parameter:
+            api_result = get_weather(parameter)
+        elif intent == "news":
+            api_result = get_news(parameter if parameter else "latest")
+        elif intent == "cricket":
+            api_result = get_cricket_scores(parameter)
+        elif intent == "stocks" and parameter:
+            api_result = get_stock_price(parameter)
+        elif intent == "trending":
+            api_result = get_trending_topics()
+        elif "happening in the world" in prompt.lower():
+            results = FanOut({"news": lambda: get_news('world'), "trending": get_trending_topics})
+            api_result = "\n\n".join(results[name] for name in ("news", "trending") if name in results)
+    except ProviderThrottled as e:
+        # Do not wait on an exhausted provider, answer from web search instead
+        print(f"Skipping provider: {e}")
     
     if api_result:
         # Log to chat history even for API results
-        try:
-            if not os.path.exists("Data"): os.makedirs("Data")
-            with open(r"Data\ChatLog.json", "r", encoding='utf-8') as f:
-                messages = json.load(f)
-        except: messages = []
-        messages.append({"role": "user", "content": prompt})
-        messages.append({"role": "assistant", "content": api_result})
-        with open(r"Data\ChatLog.json", "w", encoding='utf-8') as f:
-            json.dump(messages, f, indent=4)
+        ChatLog.Append({"role": "user", "content": prompt}, {"role": "assistant", "content": api_result})
+        if OnChunk:
+            OnChunk(api_result)  # API answers are complete at once.
         return api_result
 
     # Fallback to standard web search
-    return original_RealtimeSearchEngine(prompt)
+    return original_RealtimeSearchEngine(prompt, OnChunk)
 
 if __name__ == "__main__":
     while True:
@@ -2,10 +2,16 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from concurrent.futures import Future
 from dotenv import dotenv_values
 import os
+import time
+import threading
 import mtranslate as mt
+from Backend.Cache import LRUCache
+from Backend.Timing import Stage
+from Backend.EventBus import Bus
 
 # Load environment variables from the .env file.
 env_vars = dotenv_values(".env")
@@ -25,24 +31,61 @@ HtmlCode = '''<!DOCTYPE html>
     <script>
         const output = document.getElementById('output');
         let recognition;
+        let listening = false;
+        let waiter = null;
+        let finalText = "";
+        let interimText = "";
+        let confidence = 0;
+        let version = 0;
+
+        function snapshot() {
+            return {version: version, final: finalText, interim: interimText, confidence: confidence};
+        }
+
+        // Called through execute_async_script: completes as soon as there is a newer transcript than `since`.
+        function waitForUpdate(since, done) {
+            if (version > since) {
+                done(snapshot());
+            } else {
+                waiter = done;
+            }
+        }
 
         function startRecognition() {
             recognition = new webkitSpeechRecognition() || new SpeechRecognition();
             recognition.lang = '';
             recognition.continuous = true;
+            recognition.interimResults = false;
+            listening = true;
 
             recognition.onresult = function(event) {
-                const transcript = event.results[event.results.length - 1][0].transcript;
-                output.textContent += transcript;
+                interimText = "";
+                for (let i = event.resultIndex; i < event.results.length; i++) {
+                    const result = event.results[i];
+                    if (result.isFinal) {
+                        finalText += result[0].transcript;
+                        confidence = result[0].confidence;
+                    } else {
+                        interimText += result[0].transcript;
+                    }
+                }
+                output.textContent = finalText + interimText;
+                version++;
+                if (waiter) {
+                    const done = waiter;
+                    waiter = null;
+                    done(snapshot());
+                }
             };
 
             recognition.onend = function() {
-                recognition.start();
+                if (listening) recognition.start();
             };
             recognition.start();
         }
 
         function stopRecognition() {
+            listening = false;
             recognition.stop();
             output.innerHTML = "";
         }
@@ -50,12 +93,15 @@ HtmlCode = '''<!DOCTYPE html>
 </body>
 </html>'''
 
+# Interim results: report partial transcripts while the user is still speaking.
+InterimResults = (env_vars.get("InterimResults") or "True").lower() == "true"
+
+# Endpointing: the utterance is over after a final result, or once the transcript has not changed for this long.
+EndpointSilence = float(env_vars.get("EndpointSilenceMs") or 800) / 1000
+
 # Replace the language setting in the HTML code with the input language from the environment variables.
 HtmlCode = str(HtmlCode).replace("recognition.lang = '';", f"recognition.lang = '{InputLanguage}';")
-
-# Write the modified HTML code to a file.
-with open(r"Data\\Voice.html", "w") as f:
-    f.write(HtmlCode)
+HtmlCode = HtmlCode.replace("recognition.interimResults = false;", f"recognition.interimResults = {str(InterimResults).lower()};")
 
 # Get the current working directory.
 current_dir = os.getcwd()
@@ -74,17 +120,82 @@ chrome_options.add_argument("-use-fake-device-for-media-stream")
 
 # chrome_options.add_argument("-headless-new")
 
-# Initialize the Chrome WebDriver using the ChromeDriverManager.
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
+# File remembering the chromedriver path so later launches skip the ChromeDriverManager version check.
+DriverPathCache = os.path.join("Data", "ChromeDriver.path")
+
+# Resolved with the WebDriver once Chrome is up; SpeechRecognition waits on it.
+DriverReady = Future()
+_startup_lock = threading.Lock()
+_startup_thread = None
+
+# Seconds spent in each startup stage, filled in by the background startup thread.
+StartupTimings = {}
+
+# Function to write Voice.html only when its content changed.
+def WriteVoiceHtml():
+    os.makedirs("Data", exist_ok=True)
+    try:
+        with open(r"Data\\Voice.html", "r") as f:
+            if f.read() == HtmlCode:
+                return
+    except OSError:
+        pass
+    with open(r"Data\\Voice.html", "w") as f:
+        f.write(HtmlCode)
+
+# Function to find chromedriver, from the cached path if it still exists.
+def ResolveDriverPath(refresh=False):
+    if not refresh and os.path.exists(DriverPathCache):
+        with open(DriverPathCache, "r", encoding="utf-8") as f:
+            path = f.read().strip()
+        if os.path.exists(path):
+            return path
+    from webdriver_manager.chrome import ChromeDriverManager  # Imported lazily, it is only needed on a cache miss.
+    path = ChromeDriverManager().install()
+    with open(DriverPathCache, "w", encoding="utf-8") as f:
+        f.write(path)
+    return path
+
+# Function run on the background thread: write the page, resolve the driver and launch Chrome.
+def _StartDriver(Ready):
+    try:
+        start = time.perf_counter()
+        WriteVoiceHtml()
+        StartupTimings["html"] = time.perf_counter() - start
+
+        stage = time.perf_counter()
+        path = ResolveDriverPath()
+        StartupTimings["driver"] = time.perf_counter() - stage
+
+        stage = time.perf_counter()
+        try:
+            driver = webdriver.Chrome(service=Service(path), options=chrome_options)
+        except WebDriverException:
+            # The cached driver no longer matches the installed Chrome, resolve it again.
+            driver = webdriver.Chrome(service=Service(ResolveDriverPath(refresh=True)), options=chrome_options)
+        StartupTimings["chrome"] = time.perf_counter() - stage
+        StartupTimings["total"] = time.perf_counter() - start
+
+        print("Speech engine ready in {total:.2f}s (html {html:.2f}s, driver {driver:.2f}s, chrome {chrome:.2f}s)".format(**StartupTimings))
+        Ready.set_result(driver)
+    except Exception as e:
+        print(f"Error starting the speech engine: {e}")
+        Ready.set_exception(e)
 
-# Define the path for temporary files.
-TempDirPath = rf"{current_dir}/Frontend/Files"
+# Function to start Chrome in the background; safe to call more than once, and starts again after a failed start.
+def StartSpeechEngine():
+    global _startup_thread, DriverReady
+    with _startup_lock:
+        if _startup_thread is not None and DriverReady.done() and DriverReady.exception() is not None:
+            DriverReady, _startup_thread = Future(), None  # The last start failed: try again.
+        if _startup_thread is None:
+            _startup_thread = threading.Thread(target=_StartDriver, args=(DriverReady,), daemon=True)
+            _startup_thread.start()
+        return DriverReady
 
-# Function to set the assistant's status by writing it to a file.
+# Function to set the assistant's status on the GUI through the event bus.
 def SetAssistantStatus(Status):
-    with open(rf"{TempDirPath}/Status.data", "w", encoding='utf-8') as file:
-        file.write(Status)
+    Bus.Publish("status", Status)
 
 # Function to modify a query to ensure proper punctuation and formatting.
 def QueryModifier(Query):
@@ -103,38 +214,110 @@ def QueryModifier(Query):
     
     return new_query
 
+# Default translator: the mtranslate web service. Any callable translator(text, to_language, from_language) -> str can replace it.
+def MTranslateTranslator(Text, ToLanguage="en", FromLanguage="auto"):
+    return mt.translate(Text, ToLanguage, FromLanguage)
+
+Translator = MTranslateTranslator
+
+# Function to swap the translator, e.g. for a local stand-in in tests.
+def SetTranslator(NewTranslator):
+    global Translator
+    Translator = NewTranslator
+
+# Translations keyed on (source text, input language), so repeated commands skip the network round-trip.
+TranslationCache = LRUCache(
+    max_size=int(env_vars.get("TranslationCacheSize") or 1024),
+    ttl=float(env_vars.get("TranslationCacheTTL") or 30 * 24 * 3600),
+    path=os.path.join("Data", "TranslationCache.json")
+)
+
+# Function to build the cache key for a text in the input language.
+def TranslationKey(Text):
+    return f"{InputLanguage}\0{' '.join(Text.lower().split())}"
+
 # Universal translator function to translate text.
 def UniversalTranslator(Text):
-    english_translation = mt.translate(Text, "en", "auto")
+    with Stage("translate"):
+        english_translation = TranslationCache.Get(TranslationKey(Text))
+        if english_translation is None:
+            english_translation = Translator(Text, "en", "auto")
+            TranslationCache.Set(TranslationKey(Text), english_translation)
     return english_translation.capitalize()
 
+# A partial transcript reported while the user is still speaking.
+class PartialTranscript:
+    def __init__(self, Text, Stable, Stability):
+        self.Text = Text  # Everything recognized so far.
+        self.Stable = Stable  # Leading words that two consecutive hypotheses agreed on.
+        self.Stability = Stability  # Fraction of the words in Text that are stable (0..1).
+
+# Function to check whether the input language is English.
+def IsEnglishInput():
+    return InputLanguage.lower() == "en" or "en" in InputLanguage.lower()
+
+# Function to find the words two consecutive hypotheses agree on.
+def StablePrefix(previous, current):
+    stable = []
+    for old_word, new_word in zip(previous.split(), current.split()):
+        if old_word.lower() != new_word.lower():
+            break
+        stable.append(new_word)
+    return " ".join(stable)
+
 # Function to perform speech recognition using the WebDriver.
-def SpeechRecognition():
+# OnPartial(PartialTranscript) is called with interim transcripts (English input only, others are translated at the end).
+def SpeechRecognition(OnPartial=None):
+    # Wait until the background startup has launched Chrome (starting it now if nobody did yet or the last start failed).
+    driver = StartSpeechEngine().result()
+
     # Open the HTML file in the browser.
     driver.get("file:///" + Link)
 
     # Start speech recognition by clicking the start button.
     driver.find_element(by=By.ID, value="start").click()
 
+    # The page completes the async script from its onresult handler, so we block instead of polling.
+    # The timeout doubles as the silence endpoint: no update for that long ends the utterance.
+    driver.set_script_timeout(EndpointSilence)
+
+    version = 0
+    Text = ""
+    final = False
+    last_change = time.monotonic()
+
     while True:
         try:
-            # Get the recognized text from the HTML output element.
-            Text = driver.find_element(by=By.ID, value="output").text
-
-            if Text:
-                # Stop recognition by clicking the stop button.
-                driver.find_element(by=By.ID, value="end").click()
-
-                # If the input language is English, return the modified query.
-                if InputLanguage.lower() == "en" or "en" in InputLanguage.lower():
-                    return QueryModifier(Text)
-                else:
-                    # If the input language is not English, translate the text and return it.
-                    SetAssistantStatus("Translating...")
-                    return QueryModifier(UniversalTranslator(Text))
-
-        except Exception as e:
-            pass
+            # Wait for the next transcript update from the page.
+            update = driver.execute_async_script("waitForUpdate(arguments[0], arguments[arguments.length - 1]);", version)
+            version = update["version"]
+            previous, Text = Text, (update["final"] + update["interim"]).strip()
+            final = bool(update["final"]) and not update["interim"]
+            last_change = time.monotonic()
+
+            if OnPartial and Text and not final and IsEnglishInput():
+                stable = StablePrefix(previous, Text)
+                OnPartial(PartialTranscript(Text, stable, len(stable.split()) / len(Text.split())))
+
+        except TimeoutException:
+            pass  # No new words within the silence window.
+        except WebDriverException as e:
+            print(f"Error in SpeechRecognition: {e}")
+            time.sleep(0.5)  # Do not hammer a broken driver.
+            continue
+
+        # Endpointing: a final result, or a transcript that stopped changing.
+        if Text and (final or time.monotonic() - last_change >= EndpointSilence):
+            # Stop recognition by clicking the stop button.
+            driver.find_element(by=By.ID, value="end").click()
+
+            # If the input language is English, return the modified query.
+            if IsEnglishInput():
+                return QueryModifier(Text)
+            else:
+                # If the input language is not English, translate the text and return it.
+                SetAssistantStatus("Translating...")
+                return QueryModifier(UniversalTranslator(Text))
 
 # Main execution block.
 if __name__ == "__main__":
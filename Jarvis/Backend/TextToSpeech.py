@@ -3,96 +3,467 @@ import random     # Import random for generating random choices
 import asyncio    # Import asyncio for asynchronous operations
 import edge_tts     # Import edge_tts for text-to-speech functionality
 import os   # Import os for file path handling
+import re   # Import re for sentence segmentation
+import queue   # Import queue to pass sentences and clips between threads
+import threading   # Import threading for the synthesis and playback workers
+import time   # Import time for the playback polling interval
+import hashlib   # Import hashlib to derive content-addressed cache file names
+import io   # Import io to play streamed audio from memory buffers
 from dotenv import dotenv_values  # Import dotenv for reading environment variables from a .env file
 
 # Load environment variables from a .env file
 env_vars = dotenv_values(".env")
 AssistantVoice = env_vars.get("AssistantVoice")  # Get the AssistantVoice from the environment variables
 
-# Asynchronous function to convert text to an audio file
-async def TextToAudioFile(text) -> None:
-    file_path = r"Data\speech.mp3" # Define the path where the speech file will be saved
+# Voice settings used for every utterance
+Pitch = '+5Hz'
+Rate = '+13%'
 
-    if os.path.exists(file_path): # Check if the file already exists
-        os.remove(file_path) # If it exists, remove it to avoid overwriting errors
+# Synthesized speech is cached on disk, keyed by text and voice settings, and evicted least recently used first
+SpeechCacheDir = os.path.join("Data", "SpeechCache")
+SpeechCacheMaxBytes = int(env_vars.get("SpeechCacheMaxMB") or 50) * 1024 * 1024
+
+# Streaming playback: audio is played from memory in segments of this many bytes while edge-tts is still sending it
+StreamingPlayback = (env_vars.get("TTSStreaming") or "True").lower() == "true"
+StreamSegmentBytes = int(env_vars.get("TTSStreamSegmentBytes") or 12000)
+
+# MPEG audio Layer III header tables, used to cut streamed audio between frames rather than inside one
+Mp3Bitrates = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+Mp3SampleRates = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}  # By version bits
+
+# Function to get the length of the MP3 frame whose header starts at offset (0 if there is no valid header there)
+def Mp3FrameLength(data, offset):
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return 0
+    version = (data[offset + 1] >> 3) & 3  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = (data[offset + 1] >> 1) & 3  # 1 = Layer III
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return 0
+    bitrate = Mp3Bitrates["mpeg1" if version == 3 else "mpeg2"][bitrate_index] * 1000
+    padding = (data[offset + 2] >> 1) & 1
+    return (144 if version == 3 else 72) * bitrate // Mp3SampleRates[version][rate_index] + padding
+
+# Function to get how many leading bytes of streamed audio are whole MP3 frames; the rest waits for more data
+def Mp3CompleteLength(data):
+    offset = 0
+    while offset + 4 <= len(data):
+        length = Mp3FrameLength(data, offset)
+        if length == 0:
+            offset += 1  # Not a frame header (e.g. tag bytes): resynchronize on the next byte
+        elif offset + length > len(data):
+            break  # A partial frame
+        else:
+            offset += length
+    return offset
+
+# Function to get the cache file for a text with the current voice settings
+def SpeechCachePath(text):
+    key = hashlib.sha256(f"{text}\0{AssistantVoice}\0{Pitch}\0{Rate}".encode("utf-8")).hexdigest()
+    return os.path.join(SpeechCacheDir, f"{key}.mp3")
+
+# Function to delete the least recently used cache files once the cache grows past its size limit
+def EvictSpeechCache():
+    try:
+        entries = [os.path.join(SpeechCacheDir, name) for name in os.listdir(SpeechCacheDir) if name.endswith(".mp3")]
+        entries = sorted(((os.stat(path), path) for path in entries), key=lambda entry: entry[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in entries:
+            if total <= SpeechCacheMaxBytes:
+                break
+            try:
+                os.remove(path)
+                total -= stat.st_size
+            except OSError:
+                pass  # The file is probably being played right now.
+    except OSError as e:
+        print(f"Error evicting speech cache: {e}")
+
+# Asynchronous function to convert text to an audio file, returning the path of the (cached) MP3
+async def TextToAudioFile(text) -> str:
+    file_path = SpeechCachePath(text) # Define the path where the speech file will be saved
+
+    if os.path.exists(file_path): # Cache hit: skip the edge-tts network call entirely
+        os.utime(file_path) # Mark the entry as recently used
+        return file_path
+
+    os.makedirs(SpeechCacheDir, exist_ok=True)
 
     # Create the communicate object to generate speech
-    communicate = edge_tts.Communicate(text, AssistantVoice, pitch='+5Hz', rate='+13%')
+    communicate = edge_tts.Communicate(text, AssistantVoice, pitch=Pitch, rate=Rate)
 
-    await communicate.save(r'Data\speech.mp3') # Save the generated speech as an MP3 file
+    # Save to a temporary name first so a half-written file is never served from the cache
+    temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+    await communicate.save(temp_path)
+    os.replace(temp_path, file_path)
 
-# Function to manage Text-to-Speech (TTS) functionality
-def TTS (Text, func=lambda r=None: True):
-    while True:
-        try:
-            # Convert text to an audio file asynchronously
-            asyncio.run(TextToAudioFile(Text))
+    EvictSpeechCache()
+    return file_path
 
-            # Initialize pygame mixer for audio playback
-            pygame.mixer.init()
+# Function to store audio that was streamed from memory so the next request for the same text is a cache hit
+def StoreSpeechCache(text, data):
+    file_path = SpeechCachePath(text)
+    try:
+        os.makedirs(SpeechCacheDir, exist_ok=True)
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, file_path)
+        EvictSpeechCache()
+    except OSError as e:
+        print(f"Error caching speech: {e}")
 
-            # Load the generated speech file into pygame mixer
-            pygame.mixer.music.load(r"Data\speech.mp3")
+# Asynchronous function to play text while it is synthesized: audio chunks go to the player from memory buffers
+async def StreamToPlayer(text, func=lambda r=None: True):
+    file_path = SpeechCachePath(text)
+    if os.path.exists(file_path): # Cache hit: play the stored file
+        os.utime(file_path)
+        return Player.Play(file_path, func, NotifyEnd=False)
 
-            pygame.mixer.music.play() # Play the audio
+    communicate = edge_tts.Communicate(text, AssistantVoice, pitch=Pitch, rate=Rate)
+    audio = bytearray()  # Everything received, cached once the stream is complete.
+    segment = bytearray()  # Audio not yet handed to the player.
+    last_item = None
 
-            # Loop until the audio is done playing or the function stops
-            while pygame.mixer.music.get_busy():
-                if func() == False:  # Check if the external function returns False
-                    break
-                pygame.time.Clock().tick(10) # Limit the loop to 10 ticks per second
+    try:
+        async for chunk in communicate.stream():
+            if chunk["type"] != "audio":
+                continue
+            audio += chunk["data"]
+            segment += chunk["data"]
+            # Segments are cut only after a whole MP3 frame, so each one decodes cleanly on its own.
+            if len(segment) >= StreamSegmentBytes:
+                complete = Mp3CompleteLength(segment)
+                if complete:
+                    last_item = Player.Play(io.BytesIO(bytes(segment[:complete])), func, NotifyEnd=False)
+                    del segment[:complete]
+                if func() == False:
+                    return last_item
+    except Exception as e:
+        if last_item is None:
+            raise  # Nothing played yet, let the caller retry.
+        print(f"Error in TTS stream: {e}")
+        return last_item
 
-            return True # Return True if the audio played successfully
+    if segment:
+        last_item = Player.Play(io.BytesIO(bytes(segment)), func, NotifyEnd=False)
+    if audio:
+        StoreSpeechCache(text, bytes(audio))
+    return last_item
 
-        except Exception as e: # Handle any exceptions during the process
-            print(f"Error in TTS: {e}")
+# Function to pre-synthesize the canned responses in the background so they are cache hits later
+def WarmSpeechCache(texts=None):
+    def Warm():
+        for text in texts or responses:
+            try:
+                asyncio.run(TextToAudioFile(text))
+            except Exception as e:
+                print(f"Error warming speech cache: {e}")
+                return
+    thread = threading.Thread(target=Warm, daemon=True)
+    thread.start()
+    return thread
 
-        finally:
+# Bounded retry policy for synthesis and playback
+SynthesisAttempts = 3
+PlaybackAttempts = 3
+RetryDelay = 0.5
+
+class PlaybackItem:
+    """ One queued clip: func() is polled while it plays and returning False cancels it. """
+
+    def __init__(self, Source, func, NotifyEnd):
+        self.Source = Source  # Path or file-like object of the audio.
+        self.func = func
+        self.NotifyEnd = NotifyEnd  # Call func(False) when the clip is over, like TTS always did.
+        self.Sound = None
+        self.Played = False
+        self.Done = threading.Event()
+
+    def Wait(self):
+        self.Done.wait()
+        return self.Played
+
+class AudioPlayer:
+    """ Long-lived playback worker: the mixer is initialized once and queued clips play back to back. """
+
+    def __init__(self):
+        self.Items = queue.Queue()
+        self.Channel = None
+        self.Worker = None
+        self._lock = threading.Lock()
+
+    def Play(self, Source, func=lambda r=None: True, NotifyEnd=True):
+        # Queue a clip and start the worker on first use.
+        item = PlaybackItem(Source, func, NotifyEnd)
+        with self._lock:
+            if self.Worker is None or not self.Worker.is_alive():
+                self.Worker = threading.Thread(target=self._Run, daemon=True)
+                self.Worker.start()
+        self.Items.put(item)
+        return item
+
+    def _Mixer(self):
+        # Initialize the mixer once and reserve a channel for speech, retrying a bounded number of times.
+        for attempt in range(PlaybackAttempts):
+            if self.Channel is not None and pygame.mixer.get_init():
+                return True
             try:
-                # Call the provided function with False to signal the end of TTS
-                func(False)
-                pygame.mixer.music.stop()                    # Stop the audio playback
-                pygame.mixer.quit() # Quit the pygame mixer
+                pygame.mixer.init()
+                self.Channel = pygame.mixer.Channel(0)
+                return True
+            except Exception as e:
+                print(f"Error initializing the mixer (attempt {attempt + 1}/{PlaybackAttempts}): {e}")
+                self._Reset()
+                time.sleep(RetryDelay)
+        return False
 
-            except Exception as e: # Handle any exceptions during cleanup
+    def _Reset(self):
+        # Drop a broken mixer so the next clip initializes a fresh one.
+        self.Channel = None
+        try:
+            pygame.mixer.quit()
+        except Exception:
+            pass
+
+    def _Load(self, item):
+        # Decode the clip. A clip that does not decode fails on its own and leaves the mixer (and whatever plays) alone.
+        if not self._Mixer():
+            return False
+        try:
+            item.Sound = pygame.mixer.Sound(item.Source)
+            return True
+        except Exception as e:
+            print(f"Error decoding TTS clip: {e}")
+            return False
+
+    def _Finish(self, item, Played):
+        item.Played = Played
+        if item.NotifyEnd:
+            try:
+                item.func(False)  # Signal the end of this utterance.
+            except Exception as e:
                 print(f"Error in finally block: {e}")
+        item.Done.set()
+
+    def _Start(self, item):
+        # Play an item now, or finish it right away if it was cancelled or cannot be loaded or played.
+        try:
+            if item.func() != False and self._Load(item):
+                self.Channel.play(item.Sound)
+                return item
+        except Exception as e:
+            print(f"Error in TTS playback: {e}")
+        self._Finish(item, False)
+        return None
+
+    def _Run(self):
+        current = None  # The clip playing now.
+        following = None  # The clip queued on the channel to start the moment the current one ends.
+        while True:
+            try:
+                current, following = self._Step(current, following)
+            except Exception as e:
+                # Never leave a caller waiting: fail whatever was in flight and start over with a fresh mixer.
+                print(f"Error in TTS playback: {e}")
+                for item in (current, following):
+                    if item is not None and not item.Done.is_set():
+                        self._Finish(item, False)
+                current, following = None, None
+                self._Reset()
+
+    def _Step(self, current, following):
+        # One pass of the playback loop; returns the new (current, following).
+        if current is None:
+            return self._Start(self.Items.get()), None
+
+        if self.Channel is None:
+            # The mixer went away under the current clip (re-initialized for another one): it cannot finish playing.
+            self._Finish(current, False)
+            return (self._Start(following) if following else None), None
+
+        # Cancellation through the caller's func stops the channel and drops the queued clip.
+        if current.func() == False:
+            self.Channel.stop()
+            self._Finish(current, False)
+            return (self._Start(following) if following else None), None
+
+        # Decode the next clip while this one plays and queue it on the channel for a gapless handoff.
+        if following is None and not self.Items.empty():
+            following = self.Items.get_nowait()
+            if following.func() == False or not self._Load(following):
+                self._Finish(following, False)
+                return current, None
+            self.Channel.queue(following.Sound)
+
+        if not self.Channel.get_busy():
+            self._Finish(current, True)
+            return (self._Start(following) if following else None), None
+        if following is not None and self.Channel.get_sound() is following.Sound:
+            self._Finish(current, True)  # The channel moved on to the queued clip.
+            return following, None
+        time.sleep(0.01)
+        return current, following
+
+# The playback worker shared by TTS and SpeechPipeline
+Player = AudioPlayer()
+
+# Function to manage Text-to-Speech (TTS) functionality
+def TTS (Text, func=lambda r=None: True):
+    # Synthesize the text and queue it on the playback worker, retrying a bounded number of times
+    for attempt in range(SynthesisAttempts):
+        try:
+            if StreamingPlayback:
+                item = asyncio.run(StreamToPlayer(Text, func)) # Playback starts before synthesis finishes
+            else:
+                item = Player.Play(asyncio.run(TextToAudioFile(Text)), func, NotifyEnd=False)
+            break
+        except Exception as e: # Handle any exceptions during synthesis
+            print(f"Error in TTS (attempt {attempt + 1}/{SynthesisAttempts}): {e}")
+            time.sleep(RetryDelay * (attempt + 1))
+    else:
+        func(False) # Signal the end of TTS even though nothing was played
+        return False
+
+    # Wait until the audio has played or func() cancelled it
+    played = item.Wait() if item is not None else False
+    func(False) # Call the provided function with False to signal the end of TTS
+    return played
+
+# List of predefined responses for cases where the text is too long
+responses = [
+    "The rest of the result has been printed to the chat screen, kindly check it out sir.",
+    "The rest of the text is now on the chat screen, sir, please check it.",
+    "You can see the rest of the text on the chat screen, sir.",
+    "The remaining part of the text is now on the chat screen, sir.",
+    "Sir, you'll find more text on the chat screen for you to see.",
+    "The rest of the answer is now on the chat screen, sir.",
+    "Sir, please look at the chat screen, the rest of the answer is there.",
+    "You'll find the complete answer on the chat screen, sir.",
+    "The next part of the text is on the chat screen, sir.",
+    "Sir, please check the chat screen for more information.",
+    "There's more text on the chat screen for you, sir.",
+    "Sir, take a look at the chat screen for additional text.",
+    "You'll find more to read on the chat screen, sir.",
+    "Sir, check the chat screen for the rest of the text.",
+    "The chat screen has the rest of the text, sir.",
+    "There's more to see on the chat screen, sir, please look.",
+    "Sir, the chat screen holds the continuation of the text.",
+    "You'll find the complete answer on the chat screen, kindly check it out sir.",
+    "Please review the chat screen for the rest of the text, sir.",
+    "Sir, look at the chat screen for the complete answer."
+]
+
+# Check whether a text is long enough that only its beginning is spoken (more than 4 sentences and 250 characters)
+def IsLongAnswer(Text):
+    return len(str(Text).split(".")) > 4 and len(Text) >= 250
 
 # Function to manage Text-to-Speech with additional responses for long text
 def TextToSpeech(Text, func=lambda r=None: True):
-    Data = str(Text).split(".") # Split the text by periods into a list of sentences
-
-    # List of predefined responses for cases where the text is too long
-    responses = [
-        "The rest of the result has been printed to the chat screen, kindly check it out sir.",
-        "The rest of the text is now on the chat screen, sir, please check it.",
-        "You can see the rest of the text on the chat screen, sir.",
-        "The remaining part of the text is now on the chat screen, sir.",
-        "Sir, you'll find more text on the chat screen for you to see.",
-        "The rest of the answer is now on the chat screen, sir.",
-        "Sir, please look at the chat screen, the rest of the answer is there.",
-        "You'll find the complete answer on the chat screen, sir.",
-        "The next part of the text is on the chat screen, sir.",
-        "Sir, please check the chat screen for more information.",
-        "There's more text on the chat screen for you, sir.",
-        "Sir, take a look at the chat screen for additional text.",
-        "You'll find more to read on the chat screen, sir.",
-        "Sir, check the chat screen for the rest of the text.",
-        "The chat screen has the rest of the text, sir.",
-        "There's more to see on the chat screen, sir, please look.",
-        "Sir, the chat screen holds the continuation of the text.",
-        "You'll find the complete answer on the chat screen, kindly check it out sir.",
-        "Please review the chat screen for the rest of the text, sir.",
-        "Sir, look at the chat screen for the complete answer."
-    ]
-
-    # If the text is very long (more than 4 sentences and 250 characters), add a response message
-    if len(Data) > 4 and len(Text) >= 250:
+    # If the text is very long, speak the first two sentences and add a response message
+    if IsLongAnswer(Text):
         TTS(" ".join(Text.split(".")[0:2]) + "." + random.choice(responses), func)
 
     # Otherwise, just play the whole text
     else:
         TTS(Text, func)
 
+# Sentence boundaries inside streamed text
+SentenceEnd = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Sentences shorter than this are merged with the next one to avoid tiny synthesis requests
+MinSentenceLength = 20
+
+class SpeechPipeline:
+    """ Speaks a streamed answer sentence by sentence: sentence N+1 is synthesized while sentence N plays.
+    Feed() accepts chunks (it can be passed as OnChunk), Close() flushes the rest and waits for playback. """
+
+    def __init__(self, func=lambda r=None: True):
+        self.func = func
+        self.Text = ""  # Everything received so far.
+        self.Pending = ""  # Text after the last complete sentence.
+        self.Spoken = 0  # Sentences queued for speech.
+        self.Held = []  # Sentences after the second one, held until we know whether the answer is long.
+        self.Truncated = False
+        self.Cancelled = threading.Event()
+        self.Sentences = queue.Queue()  # Text waiting for synthesis.
+        self.LastItem = None  # The last clip handed to the playback worker.
+        self.Synthesizer = threading.Thread(target=self._Synthesize, daemon=True)
+        self.Synthesizer.start()
+
+    def Feed(self, Chunk):
+        self.Text += Chunk
+        self.Pending += Chunk
+        parts = SentenceEnd.split(self.Pending)
+        self.Pending = parts.pop()  # The last part is still incomplete.
+        sentence = ""
+        for part in parts:
+            sentence = f"{sentence} {part}".strip()
+            if len(sentence) >= MinSentenceLength:
+                self._Sentence(sentence)
+                sentence = ""
+        self.Pending = f"{sentence} {self.Pending}" if sentence else self.Pending
+
+    __call__ = Feed
+
+    def _Sentence(self, Sentence):
+        # Keep the long-answer behaviour of TextToSpeech: two sentences, then a pointer to the chat screen.
+        if self.Truncated:
+            return
+        if self.Spoken < 2:
+            self.Sentences.put(Sentence)
+            self.Spoken += 1
+            return
+        self.Held.append(Sentence)
+        if IsLongAnswer(self.Text):
+            self.Truncated = True
+            self.Held = []
+            self.Sentences.put(random.choice(responses))
+
+    def Close(self):
+        if self.Pending.strip():
+            self._Sentence(self.Pending.strip())
+            self.Pending = ""
+        if not self.Truncated:
+            for Sentence in self.Held:
+                self.Sentences.put(Sentence)
+            self.Held = []
+        self.Sentences.put(None)  # End of the answer.
+        self.Synthesizer.join()
+        if self.LastItem is not None:
+            self.LastItem.Wait()
+        try:
+            self.func(False)  # Signal the end of TTS.
+        except Exception as e:
+            print(f"Error in finally block: {e}")
+
+    def _Continue(self):
+        # Polled by the playback worker; a False from func cancels the rest of the answer.
+        if not self.Cancelled.is_set() and self.func() == False:
+            self.Cancelled.set()
+        return not self.Cancelled.is_set()
+
+    def _Synthesize(self):
+        while True:
+            Sentence = self.Sentences.get()
+            if Sentence is None:
+                return
+            if self.Cancelled.is_set():
+                continue
+            try:
+                # Queue each sentence on the shared player as soon as (the first part of) it is synthesized.
+                if StreamingPlayback:
+                    item = asyncio.run(StreamToPlayer(Sentence, self._Continue))
+                else:
+                    item = Player.Play(asyncio.run(TextToAudioFile(Sentence)), self._Continue, NotifyEnd=False)
+                self.LastItem = item or self.LastItem
+            except Exception as e:
+                print(f"Error in SpeechPipeline synthesis: {e}")
+
 # Main execution loop
 if __name__ == "__main__":
     while True:
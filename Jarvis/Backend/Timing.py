@@ -0,0 +1,40 @@
+import threading  # Import threading since stages are timed from several threads.
+import time  # Import time for the stage clock.
+from collections import defaultdict, deque  # Import containers for the bounded timing history.
+from contextlib import contextmanager  # Import contextmanager for the Stage helper.
+
+# Most recent durations (seconds) per pipeline stage, bounded so a long session does not grow them forever.
+MaxSamples = 1000
+StageTimings = defaultdict(lambda: deque(maxlen=MaxSamples))
+_lock = threading.Lock()
+
+def RecordStage(name: str, seconds: float):
+    with _lock:
+        StageTimings[name].append(seconds)
+
+@contextmanager
+def Stage(name: str):
+    """ Time a block of the pipeline: with Stage("translate"): ... """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        RecordStage(name, time.perf_counter() - start)
+
+def Percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def StageReport() -> dict:
+    # Count, mean, p50 and p95 (seconds) for every stage timed so far.
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in StageTimings.items()}
+    return {
+        name: {
+            "count": len(samples),
+            "mean": sum(samples) / len(samples) if samples else 0.0,
+            "p50": Percentile(samples, 0.5),
+            "p95": Percentile(samples, 0.95),
+        }
+        for name, samples in snapshot.items()
+    }
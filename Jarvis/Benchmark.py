@@ -0,0 +1,50 @@
+""" Headless end-to-end benchmark: replays scripted queries through MainExecution without a browser or GUI window.
+
+    python Benchmark.py Data/Benchmark.txt --rate 0.5
+    python Benchmark.py Recordings/ --simulate-audio
+
+A .txt file is a text script (one query per line); a directory of WAVs with .txt transcripts or a .jsonl manifest
+is replayed by transcript. Prints throughput and per-stage latency (decide, answer, speak and the whole query, timed
+from the moment each query arrives, so --rate pacing and --simulate-audio waits are not counted). """
+import argparse  # Import argparse for the command line.
+import os  # Import os for the audio driver setting.
+import time  # Import time for the wall clock.
+
+# No sound card on a benchmark machine: let pygame play into a dummy device so speech timing stays realistic.
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import Main  # Imported after the audio setting; does not prompt for the password when imported.
+from Backend.InputSource import ScriptInput, TranscriptReplayInput
+from Backend.Timing import StageReport
+
+def OpenSource(path, rate, simulate_audio):
+    if os.path.isfile(path) and path.lower().endswith(".txt"):
+        return ScriptInput(path, rate=rate)
+    return TranscriptReplayInput(path, rate=rate, simulate_audio=simulate_audio)
+
+def RunBenchmark(source):
+    Main.Input = source
+    Main.InitialExecution(WarmSpeech=False)  # No background synthesis competing with the measured speech.
+
+    queries = 0
+    start = time.perf_counter()
+    while True:
+        if Main.MainExecution() is False:  # Records the "query" stage itself.
+            break  # The script is exhausted.
+        queries += 1
+    return queries, time.perf_counter() - start
+
+def PrintReport(queries, elapsed):
+    print(f"\n{queries} queries in {elapsed:.2f}s ({queries / elapsed if elapsed else 0:.2f} queries/s)")
+    print(f"{'stage':<12}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}")
+    for name, stats in sorted(StageReport().items()):
+        print(f"{name:<12}{stats['count']:>7}{stats['mean']:>9.3f}{stats['p50']:>9.3f}{stats['p95']:>9.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay scripted queries through the assistant and report latency.")
+    parser.add_argument("source", help="text script (.txt), transcript manifest (.jsonl) or directory of .wav/.txt pairs")
+    parser.add_argument("--rate", type=float, default=None, help="issue at most this many queries per second")
+    parser.add_argument("--simulate-audio", action="store_true", help="wait as long as each recording lasts before its query")
+    args = parser.parse_args()
+
+    PrintReport(*RunBenchmark(OpenSource(args.source, args.rate, args.simulate_audio)))
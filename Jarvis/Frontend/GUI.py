@@ -1,36 +1,49 @@
 # fixed_jarvis.py
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QTextEdit, QWidget, QVBoxLayout, QLabel,
+    QApplication, QMainWindow, QListView, QAbstractItemView, QWidget, QVBoxLayout, QLabel,
     QSizePolicy, QFrame, QPushButton, QHBoxLayout, QStackedWidget
 )
-from PyQt5.QtGui import QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat, QIcon, QPainter
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtGui import QMovie, QColor, QFont, QPixmap, QIcon, QPainter
+from PyQt5.QtCore import Qt, QSize, QObject, pyqtSignal, QAbstractListModel, QModelIndex
 from dotenv import dotenv_values
+from Backend.EventBus import Bus
+from Backend.ChatLogStore import ChatLog
+from collections import OrderedDict
 import sys
 import os
+import time
+import threading
 
 # Load environment variables
 env_vars = dotenv_values(".env")
 Assistantname = env_vars.get("Assistantname", "HarzAI")
+Username = env_vars.get("Username") or "User"
 
 # Define paths
 current_dir = os.getcwd()
 TempDirPath = os.path.join(current_dir, "Frontend", "Files")
 GraphicsDirPath = os.path.join(current_dir, "Frontend", "Graphics")
 
-# Ensure temp directories and minimal files exist to avoid crashes
+# Status, mic state and responses travel over the in-process event bus.
+# Compatibility mode: also mirror them to Mic.data, Status.data and Responses.data for external tools.
+MirrorFiles = (env_vars.get("GUIFileMirror") or "False").lower() == "true"
+
+# Ensure temp directories exist to avoid crashes
 os.makedirs(TempDirPath, exist_ok=True)
 os.makedirs(GraphicsDirPath, exist_ok=True)
-# Minimal files (if not present) so timers/readers don't crash
-for fname, default in [
-    ("Mic.data", "False"),
-    ("Status.data", ""),
-    ("Responses.data", "")
-]:
-    fp = os.path.join(TempDirPath, fname)
-    if not os.path.exists(fp):
-        with open(fp, "w", encoding="utf-8") as _f:
-            _f.write(default)
+
+# Function to mirror a bus value to its compatibility file
+def MirrorToFile(Filename, Value):
+    try:
+        with open(os.path.join(TempDirPath, Filename), "w", encoding="utf-8") as file:
+            file.write(Value)
+    except Exception as e:
+        print(f"Error in MirrorToFile: {e}")
+
+if MirrorFiles:
+    Bus.Subscribe("mic", lambda Value: MirrorToFile("Mic.data", Value))
+    Bus.Subscribe("status", lambda Value: MirrorToFile("Status.data", Value))
+    Bus.Subscribe("response", lambda Value: MirrorToFile("Responses.data", Value[1]))
 
 
 # Function to modify answers
@@ -60,8 +73,7 @@ def QueryModifier(Query):
 
 # Function to set microphone status
 def SetMicrophoneStatus(Command):
-    with open(os.path.join(TempDirPath, "Mic.data"), "w", encoding='utf-8') as file:
-        file.write(Command)
+    Bus.Publish("mic", Command)
 def MicButtonInitialed():
     SetMicrophoneStatus("False")
 
@@ -78,31 +90,167 @@ def TempDirectoryPath(Filename):
 
 # Function to get microphone status
 def GetMicrophoneStatus():
-    try:
-        with open(os.path.join(TempDirPath, "Mic.data"), "r", encoding='utf-8') as file:
-            Status = file.read()
-        return Status
-    except:
-        return "False"
+    return Bus.Latest("mic", "False")
 
 # Function to set assistant status
 def SetAssistantStatus(Status):
-    with open(os.path.join(TempDirPath, "Status.data"), "w", encoding='utf-8') as file:
-        file.write(Status)
+    Bus.Publish("status", Status)
 
 # Function to get assistant status
 def GetAssistantStatus():
-    try:
-        with open(os.path.join(TempDirPath, "Status.data"), "r", encoding='utf-8') as file:
-            Status = file.read()
-        return Status
-    except:
-        return "Available..."
+    return Bus.Latest("status", "")
+
+# Every chat message gets a sequence number; partial updates of a streaming message keep its number,
+# so the chat view appends new messages and replaces a streaming one without comparing any text.
+ResponseSequence = 0
+StreamingSequence = None  # Sequence number of the message currently streaming in (None when none is).
+MaxRecentResponses = 500
+RecentResponses = OrderedDict()  # sequence -> (text, partial), replayed to chat views created later.
+_response_lock = threading.Lock()
+
+# Function to show text on screen (Partial=True replaces the previous partial text instead of adding a new message)
+def ShowTextToScreen(Text, Partial=False):
+    global ResponseSequence, StreamingSequence
+    with _response_lock:
+        if StreamingSequence is None:
+            ResponseSequence += 1
+        sequence = StreamingSequence or ResponseSequence
+        StreamingSequence = sequence if Partial else None
+        RecentResponses[sequence] = (Text, Partial)
+        while len(RecentResponses) > MaxRecentResponses:
+            RecentResponses.popitem(last=False)
+        Bus.Publish("response", (sequence, Text, Partial))  # Published under the lock so sequence numbers arrive in order.
+
+# Function to get the retained messages as (sequence, text, partial), oldest first
+def GetRecentResponses():
+    with _response_lock:
+        return [(sequence, Text, Partial) for sequence, (Text, Partial) in RecentResponses.items()]
+
+# Collects streamed answer chunks and pushes them to the chat view at most once per Interval seconds
+class ScreenStreamer:
+    def __init__(self, Prefix="", Interval=0.15):
+        self.Prefix = Prefix
+        self.Interval = Interval
+        self.Text = ""
+        self.LastUpdate = 0.0
+
+    def __call__(self, Chunk):
+        self.Text += Chunk
+        now = time.monotonic()
+        if now - self.LastUpdate >= self.Interval:
+            self.LastUpdate = now
+            ShowTextToScreen(self.Prefix + AnswerModifier(self.Text), Partial=True)
+
+# Re-emits bus events as Qt signals, so widgets are updated on the GUI thread whichever thread published them
+class BusBridge(QObject):
+    status = pyqtSignal(str)
+    mic = pyqtSignal(str)
+    response = pyqtSignal(int, str, bool)
 
-# Function to show text on screen
-def ShowTextToScreen(Text):
-    with open(os.path.join(TempDirPath, "Responses.data"), "w", encoding="utf-8") as file:
-        file.write(Text)
+    def __init__(self):
+        super().__init__()
+        Bus.Subscribe("status", self.status.emit)
+        Bus.Subscribe("mic", self.mic.emit)
+        Bus.Subscribe("response", lambda Value: self.response.emit(*Value))
+
+_bridge = None
+
+# Function to get the bridge, created on first use from the GUI thread
+def GetBridge():
+    global _bridge
+    if _bridge is None:
+        _bridge = BusBridge()
+    return _bridge
+
+# Function to format a chat log entry the way live messages are shown
+def FormatChatLogEntry(Entry):
+    Name = Username if Entry["role"] == "user" else Assistantname
+    return AnswerModifier(f"{Name}: {Entry['content']}")
+
+# Chat history as a list model: the view only paints visible rows, at most MaxRows are held in memory,
+# and older history is paged in from the chat log store while scrolling up
+class ChatHistoryModel(QAbstractListModel):
+    PageSize = 50
+    MaxRows = 300
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Each row is [text, sequence, older, newer]: sequence is the live message number (None for history rows);
+        # chat log entries before `older` are older than the row, entries from `newer` on are newer.
+        self.rows = []
+        self.at_tail = True  # False once the newest rows were dropped to make room for older history.
+        self.LoadTail()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.rows[index.row()][0]
+        if role == Qt.ForegroundRole:
+            return QColor("white")
+        return None
+
+    def HistoryRows(self, start, end):
+        return [[FormatChatLogEntry(Entry), None, i, i + 1] for i, Entry in enumerate(ChatLog.Range(start, end), start)]
+
+    def InsertRows(self, position, rows):
+        self.beginInsertRows(QModelIndex(), position, position + len(rows) - 1)
+        self.rows[position:position] = rows
+        self.endInsertRows()
+
+    def RemoveRows(self, start, end):
+        self.beginRemoveRows(QModelIndex(), start, end - 1)
+        del self.rows[start:end]
+        self.endRemoveRows()
+
+    # Function to show the newest page of the chat log
+    def LoadTail(self):
+        count = ChatLog.Count()
+        self.beginResetModel()
+        self.rows = self.HistoryRows(max(0, count - self.PageSize), count)
+        self.at_tail = True
+        self.endResetModel()
+
+    # Function to page older history in above the first row; returns the number of rows added
+    def FetchOlder(self):
+        first = self.rows[0][2] if self.rows else ChatLog.Count()
+        rows = self.HistoryRows(max(0, first - self.PageSize), first)
+        if rows:
+            self.InsertRows(0, rows)
+            if len(self.rows) > self.MaxRows:
+                self.RemoveRows(self.MaxRows, len(self.rows))
+                self.at_tail = False
+        return len(rows)
+
+    # Function to page newer history back in below the last row after it was dropped
+    def FetchNewer(self):
+        if self.at_tail:
+            return 0
+        last = self.rows[-1][3] if self.rows else 0
+        rows = self.HistoryRows(last, last + self.PageSize)
+        if rows:
+            self.InsertRows(len(self.rows), rows)
+            if len(self.rows) > self.MaxRows:
+                self.RemoveRows(0, len(self.rows) - self.MaxRows)
+        self.at_tail = last + len(rows) >= ChatLog.Count()
+        return len(rows)
+
+    # Function to add a live message, or update it in place while it is still streaming
+    def ShowLive(self, Sequence, Text):
+        if not self.at_tail:
+            self.LoadTail()  # Jump back to the newest messages.
+        if self.rows and self.rows[-1][1] == Sequence:
+            self.rows[-1][0] = Text
+            index = self.index(len(self.rows) - 1)
+            self.dataChanged.emit(index, index)
+            return
+        count = ChatLog.Count()
+        self.InsertRows(len(self.rows), [[Text, Sequence, count, count]])
+        if len(self.rows) > self.MaxRows:
+            self.RemoveRows(0, len(self.rows) - self.MaxRows)
 
 
 # ChatSection class
@@ -112,22 +260,23 @@ class ChatSection(QWidget):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(10, 40, 40, 100)
         layout.setSpacing(10)
-        self.chat_text_edit = QTextEdit()
-        self.chat_text_edit.setReadOnly(True)
-        # PyQt5 supports Qt.NoTextInteraction
-        self.chat_text_edit.setTextInteractionFlags(Qt.TextInteractionFlag.NoTextInteraction) # No text interaction
-        self.chat_text_edit.setFrameStyle(QFrame.NoFrame)
-        layout.addWidget(self.chat_text_edit)
+        # Virtualized list: only visible messages are laid out and painted, whatever the session length
+        self.chat_model = ChatHistoryModel(self)
+        self.chat_view = QListView()
+        self.chat_view.setModel(self.chat_model)
+        self.chat_view.setWordWrap(True)
+        self.chat_view.setResizeMode(QListView.Adjust)  # Re-wrap messages when the window is resized
+        self.chat_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.chat_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.chat_view.setFocusPolicy(Qt.NoFocus)
+        self.chat_view.setSpacing(5)
+        self.chat_view.setFrameStyle(QFrame.NoFrame)
+        self.chat_view.verticalScrollBar().valueChanged.connect(self.OnScroll)
+        layout.addWidget(self.chat_view)
         self.setStyleSheet("background-color: black;")
         layout.setStretch(0, 1)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
 
-        # Use QColor with hex for safety
-        text_color = QColor("#4FC3F7")
-        text_color_text = QTextCharFormat()
-        text_color_text.setForeground(text_color)
-        self.chat_text_edit.setCurrentCharFormat(text_color_text)
-
         # GIF label
         self.gif_label = QLabel()
         self.gif_label.setStyleSheet("border: none;")
@@ -153,16 +302,23 @@ class ChatSection(QWidget):
 
         font = QFont()
         font.setPointSize(13)
-        self.chat_text_edit.setFont(font)
+        self.chat_view.setFont(font)
 
-        # timers
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.LoadMessages)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(100)  # Adjusted timer interval
+        # True while the newest message in the view is still streaming in
+        self.streaming = False
+        self.last_sequence = 0  # Sequence number of the newest message in the view.
+
+        # Updated from the event bus instead of polling files; catch up with anything published before the GUI came up
+        bridge = GetBridge()
+        bridge.response.connect(self.LoadMessages)
+        bridge.status.connect(self.label.setText)
+        for Sequence, Text, Partial in GetRecentResponses():
+            self.LoadMessages(Sequence, Text, Partial)
+        self.label.setText(GetAssistantStatus())
+        self.chat_view.scrollToBottom()
 
         # install event filter - widget is a QObject so it's fine, but implement eventFilter
-        self.chat_text_edit.viewport().installEventFilter(self)
+        self.chat_view.viewport().installEventFilter(self)
 
         # Custom scrollbar styling via stylesheet placed on widget
         self.setStyleSheet("""
@@ -208,38 +364,39 @@ class ChatSection(QWidget):
         # placeholder, do not swallow events unless necessary
         return False
 
-    def LoadMessages(self):
-        global old_chat_message
-
+    def LoadMessages(self, Sequence, Text, Partial=False):
         try:
-            # Read the messages from the file
-            with open(os.path.join(TempDirPath, "Responses.data"), "r", encoding='utf-8') as file:
-                messages = file.read().strip()  # Strip whitespace for cleaner comparison
-
-            # Initialize old_chat_message if not already set
-            if 'old_chat_message' not in globals():
-                old_chat_message = ""
-
-            # Skip if the message has not changed or is empty
-            if messages and old_chat_message != messages:
-                self.addMessage(message=messages, color='white')
-                old_chat_message = messages  # Update old message
-
-        except FileNotFoundError:
-            # Already ensured file existence at startup, but keep safe
-            pass
+            messages = Text.strip()
+
+            # Skip empty text, messages already shown, and final messages that are already in the view
+            if not messages or Sequence < self.last_sequence or (Sequence == self.last_sequence and not self.streaming):
+                return
+
+            # Keep following the conversation only if the user has not scrolled up
+            bar = self.chat_view.verticalScrollBar()
+            follow = bar.value() == bar.maximum()
+
+            # A streaming message keeps its sequence number and is updated in place
+            self.chat_model.ShowLive(Sequence, messages)
+            self.streaming = Partial
+            self.last_sequence = Sequence
+
+            if follow:
+                self.chat_view.scrollToBottom()
+
         except Exception as e:
             print(f"Error in LoadMessages: {e}")
 
-
-    def SpeechRecogText(self):
-        try:
-            with open(os.path.join(TempDirPath, "Status.data"), "r", encoding="utf-8") as file:
-                messages = file.read()
-                self.label.setText(messages)
-        except Exception:
-            # be silent if file missing
-            self.label.setText("")
+    def OnScroll(self, value):
+        # Page history in from the chat log store when the view reaches either end
+        bar = self.chat_view.verticalScrollBar()
+        if value == bar.minimum():
+            added = self.chat_model.FetchOlder()
+            if added:
+                # Keep the message that was at the top in place instead of jumping to the oldest page
+                self.chat_view.scrollTo(self.chat_model.index(added), QAbstractItemView.PositionAtTop)
+        elif value == bar.maximum():
+            self.chat_model.FetchNewer()
 
     def load_icon(self, path, width=60, height=60):
         if os.path.exists(path):
@@ -264,18 +421,6 @@ class ChatSection(QWidget):
 
         self.toggled = not self.toggled
 
-    def addMessage(self, message, color):
-        cursor = self.chat_text_edit.textCursor()
-        format = QTextCharFormat()
-        formatm = QTextBlockFormat()
-        formatm.setTopMargin(10)
-        formatm.setLeftMargin(10)
-        format.setForeground(QColor(color))
-        cursor.setCharFormat(format)
-        cursor.setBlockFormat(formatm)
-        cursor.insertText(message + "\n")
-        self.chat_text_edit.setTextCursor(cursor)
-
 
 class InitialScreen(QWidget):
     def __init__(self, parent=None):
@@ -328,17 +473,8 @@ class InitialScreen(QWidget):
         self.setMinimumHeight(min(screen_height, 900))
         self.setMinimumWidth(min(screen_width, 1600))
         self.setStyleSheet("background-color: black;")
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(200)  # less spamming than 5 ms
-
-    def SpeechRecogText(self):
-        try:
-            with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
-                messages = file.read()
-                self.label.setText(messages)
-        except Exception:
-            self.label.setText("")
+        GetBridge().status.connect(self.label.setText)
+        self.label.setText(GetAssistantStatus())
 
     def load_icon(self, path, width=60, height=60):
         if os.path.exists(path):
@@ -62,34 +62,35 @@ def __auth__():
     print("System loading...\n")
 
 
-__auth__()
+# Only the interactive app asks for the password; Benchmark.py imports this module headless.
+if __name__ == "__main__":
+    __auth__()
 
 
 from Frontend.GUI import (
     GraphicalUserInterface,
     SetAssistantStatus,
     ShowTextToScreen,
-    TempDirectoryPath,
     SetMicrophoneStatus,
-    AnswerModifier,
     QueryModifier,
-    GetMicrophoneStatus,
-    GetAssistantStatus
+    GetAssistantStatus,
+    ScreenStreamer
 )
-from Backend.Model import FirstLayerDMM
+from Backend.Model import FirstLayerDMMStream, SpeculateDecision
 from Backend.RealtimeSearchEngine import RealtimeSearchEngine
 from Backend.Automation import Automation
-from Backend.SpeechToText import SpeechRecognition
+from Backend.InputSource import MicrophoneInput
 from Backend.Chatbot import ChatBot
-from Backend.TextToSpeech import TextToSpeech
+from Backend.TextToSpeech import TextToSpeech, SpeechPipeline, WarmSpeechCache
 from Backend.ImageGeneration import gemini
+from Backend.ChatLogStore import ChatLog
+from Backend.Timing import Stage, RecordStage
+from Backend.EventBus import Bus
 from Backend.VideoGeneration import ignite_automation
 from dotenv import dotenv_values
 from asyncio import run
-from time import sleep
 import threading
-import json
-import os
+import time
 import requests
 
 env_vars = dotenv_values(".env")
@@ -99,87 +100,100 @@ DefaultMessage = f'''{Username}: Hello {Assistantname}, How are you?
 {Assistantname}: Welcome {Username}, I am doing well. How may I help you?'''
 subprocesses = []
 Functions = ["open", "close", "play", "system", "content", "google search", "youtube search"]
+InputRetryDelay = float(env_vars.get("InputRetryDelay") or 10)  # Seconds between attempts to start a failed input source.
+
+# Where queries come from: the microphone, or a replayed script when benchmarking (see Backend/InputSource.py).
+Input = MicrophoneInput()
+
+# Set while the microphone is on; the mic buttons publish on the event bus, which wakes FirstThread immediately.
+MicActive = threading.Event()
+Bus.Subscribe("mic", lambda Status: MicActive.set() if Status == "True" else MicActive.clear())
 
 def ShowDefaultChatIfNoChats():
     try:
-        if not os.path.exists('Data'): os.makedirs('Data')
-        chat_log_path = r'Data\\ChatLog.json'
-        if not os.path.exists(chat_log_path):
-            with open(chat_log_path, 'w', encoding='utf-8') as f:
-                json.dump([], f)
-
-        with open(chat_log_path, "r", encoding='utf-8') as File:
-            content = File.read()
-            if len(content) < 5:
-                with open(TempDirectoryPath('Database.data'), 'w', encoding='utf-8') as file:
-                    file.write("")
-                with open(TempDirectoryPath("Responses.data"), 'w', encoding='utf-8') as file:
-                    file.write(DefaultMessage)
+        if ChatLog.Count() == 0:
+            ShowTextToScreen(DefaultMessage)
     except Exception as e:
         print(f"Error in ShowDefaultChatIfNoChats: {e}")
 
-def ReadChatLogJson():
-    chat_log_path = r'Data\\ChatLog.json'
-    if not os.path.exists(chat_log_path):
-        with open(chat_log_path, 'w', encoding='utf-8') as f:
-            json.dump([], f)
-    with open(chat_log_path, 'r', encoding="utf-8") as file:
-        chatlog_data = json.load(file)
-    return chatlog_data
-
-def ChatLogIntegration():
-    json_data = ReadChatLogJson()
-    formatted_chatlog = ""
-
-    for entry in json_data:
-        if entry["role"] == "user":
-            formatted_chatlog += f"User: {entry['content']}\n"
-        elif entry["role"] == "assistant":
-            formatted_chatlog += f"Assistant: {entry['content']}\n"
-
-    formatted_chatlog = formatted_chatlog.replace("User", Username + " ")
-    formatted_chatlog = formatted_chatlog.replace("Assistant", Assistantname + " ")
-
-    with open(TempDirectoryPath('Database.data'), 'w', encoding='utf-8') as file:
-        file.write(AnswerModifier(formatted_chatlog))
-
-def ShowChatsOnGUI():
-    File = open(TempDirectoryPath('Database.data'), "r", encoding='utf-8')
-    Data = File.read()
-    if len(str(Data)) > 0:
-        lines = Data.split('\n')
-        result = '\n'.join(lines)
-        File.close()
-        File = open(TempDirectoryPath('Responses.data'), "w", encoding='utf-8')
-        File.write(result)
-        File.close()
-
-def InitialExecution():
+def InitialExecution(WarmSpeech=True):
+    Input.Start()  # Launch Chrome in the background while the GUI comes up.
     SetMicrophoneStatus("False")
     ShowTextToScreen("")
-    ShowDefaultChatIfNoChats()
-    ChatLogIntegration()
-    ShowChatsOnGUI()
+    ShowDefaultChatIfNoChats()  # The chat view pages the history in from the chat log store itself.
+    if WarmSpeech:
+        WarmSpeechCache()  # Skipped by Benchmark.py so background synthesis does not skew the measured stages.
+
+def DispatchAutomation(task):
+    # Run a single automation task on its own thread so it starts while the decision is still streaming.
+    thread = threading.Thread(target=lambda: run(Automation([task])), daemon=True)
+    thread.start()
+    return thread
+
+def AnswerAndSpeak(Engine, Query):
+    # Stream the answer to the chat view and speak it sentence by sentence while it is still being generated.
+    Speech = SpeechPipeline()
+    Screen = ScreenStreamer(f"{Assistantname}: ")
+
+    def OnChunk(Chunk):
+        if not Speech.Text:
+            SetAssistantStatus("Answering...")
+        Screen(Chunk)
+        Speech.Feed(Chunk)
 
-InitialExecution()
+    try:
+        with Stage("answer"):
+            Answer = Engine(Query, OnChunk=OnChunk)
+        ShowTextToScreen(f"{Assistantname}: {Answer}")
+        SetAssistantStatus("Answering...")
+        if not Speech.Text:
+            Speech.Feed(Answer)  # Nothing was streamed (e.g. an error message), speak the final text.
+    finally:
+        # Always close the pipeline so its synthesizer thread ends and what was streamed so far is spoken.
+        with Stage("speak"):
+            Speech.Close()
+    return Answer
+
+def OnPartialSpeech(Partial):
+    # Show what has been heard so far and start classifying once the beginning of the query has settled.
+    ShowTextToScreen(f"{Username}: {Partial.Text}", Partial=True)
+    if Partial.Stability >= 0.99 and len(Partial.Stable.split()) >= 2:
+        SpeculateDecision(QueryModifier(Partial.Stable))
 
 def MainExecution():
-    TaskExecution = False
-
     ImageExecution = False
     VideoExecution = False
 
     ImageGenerationQuery = ""
     VideoGenerationQuery = ""
 
+    AutomationThreads = []
+
 
     SetAssistantStatus("Listening...")
-    Query = SpeechRecognition()
+    try:
+        Query = Input.Next(OnPartial=OnPartialSpeech)
+    except Exception as e:
+        # E.g. Chrome failed to start: report it and let the next call start the speech engine again.
+        print(f"Error in MainExecution (input): {e}")
+        SetAssistantStatus("Error!")
+        ShowTextToScreen(f"{Assistantname}: I cannot listen right now, retrying in {InputRetryDelay:.0f}s: {e}")
+        time.sleep(InputRetryDelay)
+        return True
+    if Query is None:
+        return False  # The input source is exhausted.
+    QueryStart = time.perf_counter()  # The "query" stage starts once the query is heard, not while waiting for it.
     ShowTextToScreen(f"{Username}: {Query}")
     SetAssistantStatus("Thinking...")
 
     try:
-        Decision = FirstLayerDMM(Query)
+        Decision = []
+        with Stage("decide"):
+            for task in FirstLayerDMMStream(Query):
+                Decision.append(task)
+                # Start automation tasks ("open chrome") as soon as they arrive.
+                if any(task.startswith(func) for func in Functions):
+                    AutomationThreads.append(DispatchAutomation(task))
 
         print("")
         print(f"Decision: {Decision}")
@@ -201,12 +215,6 @@ def MainExecution():
                     VideoGenerationQuery = queries.replace("video", "").strip()
                     VideoExecution = True
 
-        for queries in Decision:
-            if TaskExecution == False:
-                if any(queries.startswith(func) for func in Functions):
-                    run(Automation(list(Decision)))
-                    TaskExecution = True
-
         if ImageExecution:
             SetAssistantStatus("Generating Image...")
             ShowTextToScreen(f"{Assistantname}: Generating image...")
@@ -224,10 +232,7 @@ def MainExecution():
         
         if G and R or R:
             SetAssistantStatus("Searching...")
-            Answer = RealtimeSearchEngine(QueryModifier(Merged_query))
-            ShowTextToScreen(f"{Assistantname}: {Answer}")
-            SetAssistantStatus("Answering...")
-            TextToSpeech(Answer)
+            AnswerAndSpeak(RealtimeSearchEngine, QueryModifier(Merged_query))
             return True
         
         else:
@@ -235,19 +240,13 @@ def MainExecution():
                 if "general" in Queries:
                     SetAssistantStatus("Thinking...")
                     QueryFinal = Queries.replace("general", "")
-                    Answer = ChatBot(QueryModifier(QueryFinal))
-                    ShowTextToScreen(f"{Assistantname}: {Answer}")
-                    SetAssistantStatus("Answering...")
-                    TextToSpeech(Answer)
+                    AnswerAndSpeak(ChatBot, QueryModifier(QueryFinal))
                     return True
 
                 elif "realtime" in Queries:
                     SetAssistantStatus("Searching...")
                     QueryFinal = Queries.replace("realtime ", "")
-                    Answer = RealtimeSearchEngine(QueryModifier(QueryFinal))
-                    ShowTextToScreen(f"{Assistantname}: {Answer}")
-                    SetAssistantStatus("Answering...")
-                    TextToSpeech(Answer)
+                    AnswerAndSpeak(RealtimeSearchEngine, QueryModifier(QueryFinal))
                     return True
                 
                 elif "exit" in Queries:
@@ -263,23 +262,31 @@ def MainExecution():
         SetAssistantStatus("Error!")
         ShowTextToScreen(f"{Assistantname}: I encountered an error: {e}")
         SetAssistantStatus("Available...")
+    finally:
+        # Let the automation tasks that were started early finish before listening again.
+        for thread in AutomationThreads:
+            thread.join()
+        RecordStage("query", time.perf_counter() - QueryStart)
 
 def FirstThread():
     while True:
-        CurrentStatus = GetMicrophoneStatus()
-        if CurrentStatus == "True":
-            MainExecution()
-        else:
-            AIStatus = GetAssistantStatus()
-            if "Available..." in AIStatus:
-                sleep(0.1)
-            else:
+        if not MicActive.is_set():
+            if "Available..." not in GetAssistantStatus():
                 SetAssistantStatus("Available...")
+            MicActive.wait()  # Block without polling until the mic is switched on.
+        try:
+            MainExecution()
+        except Exception as e:
+            # Keep listening no matter what a single turn raised.
+            print(f"Error in FirstThread: {e}")
+            SetAssistantStatus("Error!")
+            time.sleep(1)
 
 def SecondThread():
     GraphicalUserInterface()
 
 if __name__ == "__main__":
+    InitialExecution()
     thread2 = threading.Thread(target=FirstThread, daemon=True)
     thread2.start()
     SecondThread()
\ No newline at end of file